@@ -1,15 +1,57 @@
+import asyncio
+import hashlib
 import logging
 import os
 import re
-import httpx
+from collections import OrderedDict
 from typing import Optional
+import numpy as np
 from app.core.config import settings
+from app.core.http import http_pool
+from app.core.resilience import space
+from app.core.admission import admission
+from app.core.singleflight import single_flight, flight_key
+from app.core.inference_cache import inference_cache, content_key
 logger = logging.getLogger(__name__)
 
 # Base URL for the HF Space
 # Endpoint: https://nagireddy5-lifehealth-v1.hf.space
 SPACE_URL = settings.HUGGINGFACE_SPACE
 
+# Default label set for screening medical images
+SIGLIP_SCREENING_CANDIDATES = ["Normal", "Fracture", "Pneumonia", "Infection", "Tumor", "Hemorrhage"]
+
+# image_version() result for an image whose current content can't be identified
+NO_CACHE = "no-cache"
+
+
+async def image_version(image_url: str) -> str:
+    """
+    Result-cache key component for an image: its URL plus the ETag / Last-Modified from a
+    HEAD request, so a replaced image gets new entries without the body being downloaded.
+    If the server sends neither, the body is downloaded and hashed instead; if that fails
+    too, returns NO_CACHE and the results for this image are not cached.
+    Callers that use one image for several models compute it once and pass it along.
+    """
+    if not image_url:
+        return ""
+    try:
+        validator = await http_pool.fetch_validator(image_url)
+    except Exception as e:
+        logger.debug(f"No validator for {image_url}: {e}")
+        validator = None
+    if validator:
+        return f"{image_url}#{validator}"
+    try:
+        return f"sha256:{hashlib.sha256(await http_pool.fetch_bytes(image_url)).hexdigest()}"
+    except Exception as e:
+        logger.warning(f"Image {image_url} not fetchable, not caching its results: {e}")
+        return NO_CACHE
+
+
+def _image_cache_key(model: str, version: str, *parts: str) -> Optional[str]:
+    return None if version == NO_CACHE else content_key(model, version, *parts)
+
 
 class MedVQA:
     """Generic Medical Vision Question Answering via /agent/vision (MedGemma base)."""
@@ -17,30 +59,57 @@ class MedVQA:
     def __init__(self, endpoint: str = "/agent/vision"):
         self.base_url = SPACE_URL
         self.endpoint_path = endpoint
-        self.timeout = 120.0
+        self.model_name = endpoint.rsplit("/", 1)[-1]
+        self.timeout = http_pool.timeout("vision")
         logger.info(f"MedVQA initialized → {self.base_url}{self.endpoint_path}")
 
-    async def answer_question(self, question: str, image_path: Optional[str] = None):
+    async def answer_question(self, question: str, image_path: Optional[str] = None, version: Optional[str] = None):
         """
         Sends query to the vision endpoint (StreamingResponse / text/plain).
         Request Body: {"prompt": "...", "image_url": "..."}
-        Yields chunks of text.
+        Yields chunks of text. Identical concurrent requests share one upstream stream;
+        completed answers are served from the result cache (keyed by image version + prompt;
+        `version` is image_version(image_path) if the caller already has it).
         """
-        endpoint = f"{self.base_url}{self.endpoint_path}"
-
         payload = {"prompt": question, "image_url": ""}
         if image_path and image_path.startswith("http"):
             payload["image_url"] = image_path
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                async with client.stream("POST", endpoint, json=payload) as resp:
+        if version is None or not payload["image_url"]:
+            version = await image_version(payload["image_url"])
+        cache_key = _image_cache_key(self.model_name, version, question)
+        cached = await inference_cache.get(self.model_name, cache_key) if cache_key else None
+        if cached is not None:
+            yield cached
+            return
+
+        key = flight_key(self.endpoint_path, payload["prompt"], payload["image_url"])
+        async for chunk in single_flight.stream(key, lambda: self._stream_answer(payload, cache_key)):
+            yield chunk
+
+    async def _stream_answer(self, payload: dict, cache_key: Optional[str]):
+        endpoint = f"{self.base_url}{self.endpoint_path}"
+        client = http_pool.client
+        try:
+            # The slot is held until the stream has been read to the end
+            async with admission.slot(self.endpoint_path):
+                resp = await space.call(self.endpoint_path, lambda: client.send(
+                    client.build_request("POST", endpoint, json=payload, timeout=self.timeout), stream=True,
+                ))
+                try:
                     resp.raise_for_status()
+                    chunks = []
                     async for chunk in resp.aiter_text():
+                        chunks.append(chunk)
                         yield chunk
-            except Exception as e:
-                logger.error(f"MedVQA Error ({self.endpoint_path}): {e}")
-                yield f"Error connecting to AI Agent: {e}"
+                finally:
+                    await resp.aclose()
+            # Only complete answers are cached
+            if chunks and cache_key:
+                await inference_cache.set(self.model_name, cache_key, "".join(chunks))
+        except Exception as e:
+            logger.error(f"MedVQA Error ({self.endpoint_path}): {e}")
+            yield f"Error connecting to AI Agent: {e}"
 
 
 class MedSkinIndia(MedVQA):
@@ -58,64 +127,201 @@ class MedSkinIndia(MedVQA):
 class MedASR:
     """Medical Automatic Speech Recognition via /agent/speech."""
 
+    model_name = "medasr"
+
     def __init__(self):
         self.base_url = SPACE_URL
-        self.timeout = 60.0
+        self.timeout = http_pool.timeout("speech")
 
     async def transcribe(self, audio_data: bytes, filename: str = "audio.wav") -> str:
         """
         Sends audio bytes as a multipart file upload to /agent/speech.
-        Returns transcription string.
+        Returns transcription string. Identical audio is served from the inference cache
+        (non-empty transcripts only).
         """
+        cache_key = content_key(self.model_name, audio_data)
+        cached = await inference_cache.get(self.model_name, cache_key)
+        if cached is not None:
+            return cached
+
         endpoint = f"{self.base_url}/agent/speech"
         files = {"file": (filename, audio_data, "audio/wav")}
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                resp = await client.post(endpoint, files=files)
-                resp.raise_for_status()
-                data = resp.json()
-                raw_text = data.get("transcription", "")
-                
-                # Clean out the CTC blank tokens and special EOS tags
-                clean_text = raw_text.replace("<epsilon>", "").replace("</s>", "").replace("<pad>", "")
-                
-                # Use regex to remove duplicate adjacent words (caused by CTC alignment overlap)
-                clean_text = re.sub(r'\b(\w+)( \1\b)+', r'\1', clean_text)
-                
-                # Strip extra whitespace
-                clean_text = " ".join(clean_text.split())
-
-                return clean_text
-            except Exception as e:
-                logger.error(f"MedASR Error: {e}")
-                return ""
+        try:
+            async with admission.slot("/agent/speech"):
+                resp = await space.call("/agent/speech", lambda: http_pool.client.post(endpoint, files=files, timeout=self.timeout))
+            resp.raise_for_status()
+            data = resp.json()
+            raw_text = data.get("transcription", "")
+            
+            # Clean out the CTC blank tokens and special EOS tags
+            clean_text = raw_text.replace("<epsilon>", "").replace("</s>", "").replace("<pad>", "")
+            
+            # Use regex to remove duplicate adjacent words (caused by CTC alignment overlap)
+            clean_text = re.sub(r'\b(\w+)( \1\b)+', r'\1', clean_text)
+            
+            # Strip extra whitespace
+            clean_text = " ".join(clean_text.split())
+
+            # Empty transcripts may be a transient model failure; don't pin them in the cache
+            if clean_text:
+                await inference_cache.set(self.model_name, cache_key, clean_text)
+            return clean_text
+        except Exception as e:
+            logger.error(f"MedASR Error: {e}")
+            return ""
 
 
 class MedSigLIP:
     """Medical image zero-shot classification via /agent/siglip/text."""
 
+    model_name = "siglip"
+
     def __init__(self):
         self.base_url = SPACE_URL
-        self.timeout = 30.0
+        self.timeout = http_pool.timeout("siglip")
 
-    async def predict_text(self, image_url: str, candidates: list[str]) -> dict:
+    async def predict_text(self, image_url: str, candidates: list[str], version: Optional[str] = None) -> dict:
         """
         Zero-shot classification.
         Request Body: {"image_url": "...", "candidates": [...]}
         Returns: {"prediction": "...", "confidence": 0.95}
+        Identical concurrent requests share one upstream call; results are cached by
+        image version + candidate set.
         """
+        key = flight_key("/agent/siglip/text", image_url, *candidates)
+        return dict(await single_flight.do(key, lambda: self._predict_text(image_url, candidates, version)))
+
+    async def predict_batch(self, items: list[tuple[str, list[str]]], concurrency: Optional[int] = None) -> list[dict]:
+        """
+        Classify many (image_url, candidates) pairs. Items are scheduled in chunks of
+        SIGLIP_BATCH_CHUNK_SIZE, with at most `concurrency` requests in flight
+        (SIGLIP_BATCH_CONCURRENCY); results are returned in input order, {} for failures.
+        """
+        limiter = asyncio.Semaphore(concurrency or settings.SIGLIP_BATCH_CONCURRENCY)
+        chunk_size = max(1, settings.SIGLIP_BATCH_CHUNK_SIZE)
+
+        async def one(image_url: str, candidates: list[str]) -> dict:
+            async with limiter:
+                return await self.predict_text(image_url, candidates)
+
+        results: list[dict] = []
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            results.extend(await asyncio.gather(*[one(url, candidates) for url, candidates in chunk]))
+        return results
+
+    async def _predict_text(self, image_url: str, candidates: list[str], version: Optional[str]) -> dict:
+        cache_key = _image_cache_key(self.model_name, version or await image_version(image_url), *candidates)
+        cached = await inference_cache.get(self.model_name, cache_key) if cache_key else None
+        if cached is not None:
+            return cached
+
         endpoint = f"{self.base_url}/agent/siglip/text"
         payload = {"image_url": image_url, "candidates": candidates}
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                resp = await client.post(endpoint, json=payload)
-                resp.raise_for_status()
-                return resp.json()
-            except Exception as e:
-                logger.error(f"MedSigLIP Error: {e}")
-                return {}
+        try:
+            async with admission.slot("/agent/siglip/text"):
+                resp = await space.call("/agent/siglip/text", lambda: http_pool.client.post(endpoint, json=payload, timeout=self.timeout))
+            resp.raise_for_status()
+            result = resp.json()
+            if result and cache_key:
+                await inference_cache.set(self.model_name, cache_key, result)
+            return result
+        except Exception as e:
+            logger.error(f"MedSigLIP Error: {e}")
+            return {}
+
+
+class MedSigLIPEmbed:
+    """
+    Zero-shot scoring from SigLIP embeddings via /agent/siglip/embed.
+    Request Body: {"image_url": "..."} or {"texts": [...]}; Returns: {"embeddings": [[...], ...]}
+
+    Each image is embedded once (cached by image version) and each label set once
+    (cached per label set), so scoring an image against any label set is a local
+    dot product + softmax instead of a GPU round trip.
+    """
+
+    model_name = "siglip-embed"
+    _max_label_sets = 64
+
+    def __init__(self):
+        self.base_url = SPACE_URL
+        self.timeout = http_pool.timeout("siglip")
+        self._label_sets: OrderedDict = OrderedDict() # In-process LRU in front of the disk cache
+
+    async def _embed(self, payload: dict) -> Optional[np.ndarray]:
+        endpoint = f"{self.base_url}/agent/siglip/embed"
+        try:
+            async with admission.slot("/agent/siglip/embed"):
+                resp = await space.call("/agent/siglip/embed", lambda: http_pool.client.post(endpoint, json=payload, timeout=self.timeout))
+            resp.raise_for_status()
+            embeddings = resp.json().get("embeddings", [])
+        except Exception as e:
+            logger.error(f"MedSigLIP embed Error: {e}")
+            return None
+        if not embeddings:
+            return None
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    async def embed_image(self, image_url: str, version: Optional[str] = None) -> Optional[np.ndarray]:
+        """Unit-norm image embedding, shape (D,). None on failure."""
+        cache_key = _image_cache_key(self.model_name, version or await image_version(image_url), "image")
+        cached = await inference_cache.get(self.model_name, cache_key) if cache_key else None
+        if cached is not None:
+            return np.asarray(cached, dtype=np.float32)
+
+        vectors = await single_flight.do(
+            flight_key("/agent/siglip/embed", image_url), lambda: self._embed({"image_url": image_url})
+        )
+        if vectors is None:
+            return None
+        if cache_key:
+            await inference_cache.set(self.model_name, cache_key, vectors[0].tolist())
+        return vectors[0]
+
+    async def embed_labels(self, candidates: list[str]) -> Optional[np.ndarray]:
+        """Unit-norm text embeddings for a label set, shape (len(candidates), D). None on failure."""
+        cache_key = content_key(self.model_name, "labels", *candidates)
+        if cache_key in self._label_sets:
+            self._label_sets.move_to_end(cache_key)
+            return self._label_sets[cache_key]
+
+        cached = await inference_cache.get(self.model_name, cache_key)
+        if cached is not None:
+            vectors = np.asarray(cached, dtype=np.float32)
+        else:
+            vectors = await single_flight.do(
+                flight_key("/agent/siglip/embed", *candidates), lambda: self._embed({"texts": list(candidates)})
+            )
+            if vectors is None or len(vectors) != len(candidates):
+                return None
+            await inference_cache.set(self.model_name, cache_key, vectors.tolist())
+
+        self._label_sets[cache_key] = vectors
+        if len(self._label_sets) > self._max_label_sets:
+            self._label_sets.popitem(last=False)
+        return vectors
+
+    async def classify(self, image_url: str, candidates: list[str], version: Optional[str] = None) -> dict:
+        """
+        Same result shape as MedSigLIP.predict_text, plus "scores" (softmax over the labels).
+        Returns {} if either embedding is unavailable.
+        """
+        image, labels = await asyncio.gather(self.embed_image(image_url, version), self.embed_labels(candidates))
+        if image is None or labels is None:
+            return {}
+        logits = settings.SIGLIP_LOGIT_SCALE * (labels @ image)
+        probs = np.exp(logits - logits.max())
+        probs /= probs.sum()
+        best = int(np.argmax(probs))
+        return {
+            "prediction": candidates[best],
+            "confidence": round(float(probs[best]), 4),
+            "scores": {label: round(float(p), 4) for label, p in zip(candidates, probs)},
+        }
 
 
 class MedHEAR:
@@ -125,32 +331,41 @@ class MedHEAR:
     acoustic health patterns (coughs, breathing, cardiac sounds).
     """
 
+    model_name = "hear"
+
     def __init__(self):
         self.base_url = SPACE_URL
-        self.timeout = 60.0
+        self.timeout = http_pool.timeout("hear")
 
     async def embed(self, audio_data: bytes, filename: str = "audio.wav") -> list[float]:
         """
         Uploads audio bytes to /agent/hear/embed.
         Returns a float embedding vector (shape: [1, D] flattened to list).
-        Returns an empty list on failure.
+        Returns an empty list on failure. Identical audio is served from the inference cache.
         """
+        cache_key = content_key(self.model_name, audio_data)
+        cached = await inference_cache.get(self.model_name, cache_key)
+        if cached is not None:
+            return cached
+
         endpoint = f"{self.base_url}/agent/hear/embed"
         files = {"file": (filename, audio_data, "audio/wav")}
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                resp = await client.post(endpoint, files=files)
-                resp.raise_for_status()
-                data = resp.json()
-                embeddings = data.get("embeddings", [])
-                # Response is [[...]] (batch of 1), flatten to 1D
-                if embeddings and isinstance(embeddings[0], list):
-                    return embeddings[0]
-                return embeddings
-            except Exception as e:
-                logger.error(f"MedHEAR Error: {e}")
-                return []
+        try:
+            async with admission.slot("/agent/hear/embed"):
+                resp = await space.call("/agent/hear/embed", lambda: http_pool.client.post(endpoint, files=files, timeout=self.timeout))
+            resp.raise_for_status()
+            data = resp.json()
+            embeddings = data.get("embeddings", [])
+            # Response is [[...]] (batch of 1), flatten to 1D
+            if embeddings and isinstance(embeddings[0], list):
+                embeddings = embeddings[0]
+            if embeddings:
+                await inference_cache.set(self.model_name, cache_key, embeddings)
+            return embeddings
+        except Exception as e:
+            logger.error(f"MedHEAR Error: {e}")
+            return []
 
 
 # ── Singletons ──────────────────────────────────────────────────────────────
@@ -160,6 +375,7 @@ _medasr_instance = None
 _siglip_instance = None
 _skin_instance = None
 _hear_instance = None
+_siglip_embed_instance = None
 
 
 def get_vqa_chain() -> MedVQA:
@@ -183,6 +399,14 @@ def get_siglip_model() -> MedSigLIP:
     return _siglip_instance
 
 
+def get_siglip_embedder() -> MedSigLIPEmbed:
+    """Returns the SigLIP embedding client (local zero-shot scoring) singleton."""
+    global _siglip_embed_instance
+    if _siglip_embed_instance is None:
+        _siglip_embed_instance = MedSigLIPEmbed()
+    return _siglip_embed_instance
+
+
 def get_skin_chain() -> MedSkinIndia:
     """Returns the Indian Skin Specialist (MedGemma + LoRA) singleton."""
     global _skin_instance
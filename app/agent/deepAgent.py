@@ -2,16 +2,17 @@ from typing import TypedDict, Optional, List, Dict
 import logging
 import json
 import asyncio
-import httpx
-import math
 from langchain_core.messages import HumanMessage, SystemMessage
 from langgraph.graph import StateGraph, END, START
 from tavily import TavilyClient
 from langchain_groq import ChatGroq
 
 from app.core.config import settings
-from app.agent.LLM.llm import get_vqa_chain, get_medasr_chain, get_siglip_model, get_hear_model
+from app.agent.LLM.llm import get_vqa_chain, get_medasr_chain, get_siglip_model, get_siglip_embedder, get_hear_model, image_version, SIGLIP_SCREENING_CANDIDATES
 from app.utils.pdf import extract_text_from_pdf_url
+from app.utils.audio import normalize_wav
+from app.core.http import http_pool
+from app.core.hear_anomaly import hear_anomaly
 
 # Configure Logging
 logger = logging.getLogger("deep-research-agent")
@@ -52,10 +53,7 @@ async def process_audio(state: ResearchState):
         audio_url = state["audio_url"]
         logger.info(f"MedASR: Processing audio from {audio_url}")
 
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(audio_url)
-            resp.raise_for_status()
-            audio_bytes = resp.content
+        audio_bytes = await asyncio.to_thread(normalize_wav, await http_pool.fetch_bytes(audio_url))
 
         medasr = get_medasr_chain()
         transcription = await medasr.transcribe(audio_bytes, filename="patient_audio.wav")
@@ -74,7 +72,8 @@ async def process_hear_audio(state: ResearchState):
     NEW: Downloads audio and generates a HeAR (Health Acoustic Representation) embedding.
     HeAR captures acoustic health signals such as cough patterns, breathing irregularities,
     and cardiac sounds — separate from speech transcription.
-    The embedding vector magnitude is used as a proxy for acoustic health anomaly level.
+    The anomaly level comes from the embedding's calibrated distance to the stored
+    population of recordings (see app.core.hear_anomaly).
     """
     if not state.get("audio_url"):
         return {"hear_summary": "No audio provided for acoustic analysis."}
@@ -83,10 +82,7 @@ async def process_hear_audio(state: ResearchState):
         audio_url = state["audio_url"]
         logger.info(f"HeAR: Generating acoustic embeddings from {audio_url}")
 
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(audio_url)
-            resp.raise_for_status()
-            audio_bytes = resp.content
+        audio_bytes = await asyncio.to_thread(normalize_wav, await http_pool.fetch_bytes(audio_url))
 
         hear = get_hear_model()
         embedding = await hear.embed(audio_bytes, filename="patient_audio.wav")
@@ -94,40 +90,42 @@ async def process_hear_audio(state: ResearchState):
         if not embedding:
             return {"hear_summary": "HeAR acoustic analysis unavailable for this audio."}
 
-        # Interpret embedding: compute L2 norm as a rough acoustic energy / anomaly indicator
-        # High norm → acoustically rich / potentially abnormal signal
-        norm = math.sqrt(sum(x ** 2 for x in embedding))
         dim = len(embedding)
+        assessment = (await hear_anomaly.assess(embedding))[0]
+        anomaly_level = assessment["level"]
 
-        # Rough thresholding (empirical — can be calibrated with labelled data)
-        if norm > 15:
-            anomaly_level = "High"
+        if anomaly_level == "High":
             interpretation = (
-                "The acoustic embedding shows a HIGH energy signature, suggesting possible "
-                "respiratory distress, persistent cough, or abnormal breathing patterns. "
+                "The acoustic embedding is far outside the typical range of stored recordings, "
+                "suggesting possible respiratory distress, persistent cough, or abnormal breathing patterns. "
                 "Recommend clinical evaluation of respiratory and cardiac status."
             )
-        elif norm > 8:
-            anomaly_level = "Moderate"
+        elif anomaly_level == "Moderate":
             interpretation = (
-                "The acoustic embedding shows a MODERATE energy signature. "
-                "Some irregularity in breathing or vocal patterns detected. "
+                "The acoustic embedding is less typical than most stored recordings. "
+                "Some irregularity in breathing or vocal patterns may be present. "
                 "Monitor the patient and correlate with other clinical findings."
             )
-        else:
-            anomaly_level = "Low"
+        elif anomaly_level == "Low":
             interpretation = (
-                "The acoustic embedding shows a LOW energy signature. "
+                "The acoustic embedding is within the typical range of stored recordings. "
                 "No prominent acoustic health anomalies detected from this recording."
             )
+        else:
+            anomaly_level = "Not assessed"
+            interpretation = (
+                "Acoustic anomaly scoring is not calibrated yet (too few stored recordings). "
+                "Interpret the audio with the other clinical findings."
+            )
 
+        score = "n/a" if assessment["score"] is None else f"{assessment['score']:.2f} (percentile {assessment['percentile']:.0f})"
         summary = (
-            f"HeAR Acoustic Analysis (embedding dim={dim}, L2 norm={norm:.2f}):\n"
+            f"HeAR Acoustic Analysis (embedding dim={dim}, anomaly score={score}):\n"
             f"Anomaly Level: {anomaly_level}\n"
             f"Interpretation: {interpretation}"
         )
 
-        logger.info(f"HeAR summary generated — norm={norm:.2f}, level={anomaly_level}")
+        logger.info(f"HeAR summary generated — score={score}, level={anomaly_level}")
         return {"hear_summary": summary}
 
     except Exception as e:
@@ -147,20 +145,23 @@ async def process_image(state: ResearchState):
 
     findings = ""
     label = "N/A"
+    # One HEAD request keys every model's cached result for this image
+    version = await image_version(image_url)
 
     # 1. MedVQA — detailed visual analysis
     try:
         llm_vqa = get_vqa_chain()
-        async for chunk in llm_vqa.answer_question(question=prompt, image_path=image_url):
+        async for chunk in llm_vqa.answer_question(question=prompt, image_path=image_url, version=version):
             findings += chunk
     except Exception as e:
         findings = f"Error in MedVQA: {e}"
 
-    # 2. MedSigLIP — zero-shot classification label
+    # 2. MedSigLIP — zero-shot classification label, scored locally from cached embeddings
+    #    (falls back to the Space's zero-shot endpoint if embeddings are unavailable)
     try:
-        siglip = get_siglip_model()
-        candidates = ["Normal", "Fracture", "Pneumonia", "Infection", "Tumor", "Hemorrhage"]
-        result = await siglip.predict_text(image_url=image_url, candidates=candidates)
+        result = await get_siglip_embedder().classify(image_url, SIGLIP_SCREENING_CANDIDATES, version)
+        if not result:
+            result = await get_siglip_model().predict_text(image_url=image_url, candidates=SIGLIP_SCREENING_CANDIDATES, version=version)
         label = result.get("prediction", "N/A")
     except Exception as e:
         logger.warning(f"SigLIP error: {e}")
@@ -4,7 +4,7 @@ from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
 import logging
 import io
-import httpx
+from app.core.http import http_pool
 from PIL import Image
 
 from app.agent.LLM.llm import get_vqa_chain
@@ -40,10 +40,7 @@ async def load_document(state: AgentState):
     else:
         # Assume Image
         # Download to temp file for MedVQA to read
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            image_bytes = resp.content
+        image_bytes = await http_pool.fetch_bytes(url)
             
         import tempfile, os
         fd, path = tempfile.mkstemp(suffix=".jpg") # MedVQA might expect extension
@@ -1,5 +1,5 @@
 import json
-import httpx
+from app.core.http import http_pool
 from google import genai
 from google.genai import types
 from typing import List, Dict, Any
@@ -17,10 +17,7 @@ async def populate_event_data(image_url: str, keys: List[str]) -> Dict[str, Any]
     """
     try:
         # 1. Download the image
-        async with httpx.AsyncClient() as client:
-            response = await client.get(image_url)
-            response.raise_for_status()
-            image_data = response.content
+        image_data = await http_pool.fetch_bytes(image_url)
             
         # 2. Setup Gemini Model with structured output configuration
         model_name = settings.GENERAL_MODEL or "gemini-3-flash-preview"
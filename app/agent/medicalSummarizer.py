@@ -1,5 +1,5 @@
 import json
-import httpx
+from app.core.http import http_pool
 from google import genai
 from google.genai import types
 from app.core.config import settings
@@ -61,10 +61,7 @@ async def stream_medical_summary(image_url: str, use_skin_specialist: bool = Fal
         # ── General mode: Gemini Vision (lab reports, prescriptions, X-rays) ──
         try:
             # 1. Download the image
-            async with httpx.AsyncClient() as client:
-                response = await client.get(image_url)
-                response.raise_for_status()
-                image_data = response.content
+            image_data = await http_pool.fetch_bytes(image_url)
 
             # 2. Setup Gemini Model
             model_name = settings.GENERAL_MODEL or "gemini-3-flash-preview"
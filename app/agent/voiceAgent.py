@@ -2,11 +2,13 @@
 Voice Agent - Medical Speech-to-Text using Remote MedASR
 WebSocket endpoint to receive audio, transcribe using remote HF Space.
 """
+import asyncio
 import io
 import logging
 import base64
 import wave
 from app.agent.LLM.llm import get_medasr_chain
+from app.utils.audio import normalize_wav
 
 logger = logging.getLogger(__name__)
 
@@ -15,18 +17,21 @@ SAMPLE_RATE = 16000
 async def transcribe_audio(audio_bytes: bytes) -> str:
     """
     Transcribe raw audio bytes (WAV / raw PCM) to text using Remote MedASR.
-    Wraps PCM in WAV container if needed, then uploads as file.
+    Wraps PCM in WAV container if needed (WAVs are normalized to 16 kHz mono int16),
+    then uploads as file.
     """
     medasr = get_medasr_chain()
     
     # ─── 1. Ensure Audio is WAV ───
     final_wav_bytes = audio_bytes
     
-    # Simple check for RIFF header
-    if not audio_bytes.startswith(b'RIFF'):
-        # Assume Raw 16-bit PCM @ 16kHz
-        # Wrap in WAV header
-        try:
+    try:
+        # Simple check for RIFF header
+        if audio_bytes.startswith(b'RIFF'):
+            final_wav_bytes = await asyncio.to_thread(normalize_wav, audio_bytes)
+        else:
+            # Assume Raw 16-bit PCM @ 16kHz
+            # Wrap in WAV header
             with io.BytesIO() as wav_io:
                 with wave.open(wav_io, 'wb') as wav_file:
                     wav_file.setnchannels(1)
@@ -34,9 +39,9 @@ async def transcribe_audio(audio_bytes: bytes) -> str:
                     wav_file.setframerate(SAMPLE_RATE)
                     wav_file.writeframes(audio_bytes)
                 final_wav_bytes = wav_io.getvalue()
-        except Exception as e:
-            logger.error(f"Failed to wrap PCM in WAV: {e}")
-            return ""
+    except Exception as e:
+        logger.error(f"Failed to prepare WAV: {e}")
+        return ""
 
     if len(final_wav_bytes) < 100:
         return ""
@@ -516,3 +516,79 @@ async def remove_lab_assistant(
     await db.refresh(user)
     return user
 
+
+@router.get("/inference-cache")
+async def get_inference_cache_metrics(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Size, evictions and per-model hit/miss counts of the remote inference cache.
+    """
+    from app.core.inference_cache import inference_cache
+    return await inference_cache.metrics()
+
+@router.delete("/inference-cache")
+async def purge_inference_cache(
+    model: Optional[str] = Query(None, description="Only purge this model (e.g. vision, siglip, medasr, hear)"),
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Drop cached inference results, for one model or all of them.
+    """
+    from app.core.inference_cache import inference_cache
+    deleted = await inference_cache.purge(model)
+    return {"deleted": deleted, "model": model}
+
+@router.get("/embedding-store")
+async def get_embedding_store_metrics(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Size of the HeAR embedding store (recordings, patients, mapped capacity).
+    """
+    from app.core.embedding_store import hear_store
+    return hear_store.metrics()
+
+@router.get("/hear-anomaly")
+async def get_hear_anomaly_calibration(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Current HeAR anomaly calibration: stored recordings vs. those in the last fit, thresholds.
+    """
+    from app.core.hear_anomaly import hear_anomaly
+    return hear_anomaly.metrics()
+
+@router.post("/hear-anomaly/recalibrate")
+async def recalibrate_hear_anomaly(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Refit the HeAR anomaly model (population statistics and level thresholds) on all stored embeddings.
+    """
+    from app.core.hear_anomaly import hear_anomaly
+    return await hear_anomaly.recalibrate()
+
+@router.get("/http-pool")
+async def get_http_pool_metrics(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Per-host request, new-connection and reuse counts of the shared HTTP client.
+    """
+    from app.core.http import http_pool
+    return http_pool.metrics()
+
+@router.get("/space-health")
+async def get_space_health(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    HF Space circuit-breaker state, retries and cold-start waits per endpoint,
+    how many identical in-flight requests were coalesced, and admission queues
+    (slots in use, waiters by priority, deadline timeouts) per endpoint.
+    """
+    from app.core.resilience import space
+    from app.core.singleflight import single_flight
+    from app.core.admission import admission
+    return {**space.metrics(), "single_flight": single_flight.metrics(), "admission": admission.metrics()}
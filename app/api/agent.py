@@ -2,11 +2,12 @@
 AI Agent API Endpoints
 Provides endpoints for AI-powered appointment suggestions
 """
+import asyncio
 from typing import Any, Optional
 from datetime import date
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.api import deps
 from app.models.user import User
@@ -81,6 +82,7 @@ from app.models.appointment_chat import ChatResponse, AppointmentChat
 from sqlalchemy import select
 
 from fastapi.responses import StreamingResponse
+from app.core.admission import admission_context, admitted_stream
 
 @router.post("/analyze")
 async def analyze_report(
@@ -90,8 +92,11 @@ async def analyze_report(
 ):
     """
     Analyze a medical document using MedGemma (Streaming).
+    MedGemma calls are admitted by the appointment's severity / caller's role; while
+    waiting, {"type": "queue", "endpoint", "position"} events are streamed.
     """
     try:
+        priority = await deps.get_request_priority(db, current_user, request.appointment_id)
         stream = analyze_medical_document(
             user_id=current_user.id,
             document_url=request.document_url,
@@ -99,7 +104,7 @@ async def analyze_report(
             appointment_id=request.appointment_id,
             db=db
         )
-        return StreamingResponse(stream, media_type="text/event-stream")
+        return StreamingResponse(admitted_stream(stream, priority), media_type="text/event-stream")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -172,12 +177,14 @@ class DeepResearchRequest(BaseModel):
     audio_url: Optional[str] = None
     pdf_url: Optional[str] = None
     vision_prompt: Optional[str] = None
+    appointment_id: Optional[str] = None   # Used for GPU queue priority (appointment severity)
 
 from app.agent.deepAgent import run_deep_research
 
 @router.post("/deep-research")
 async def deep_research_endpoint(
     request: DeepResearchRequest,
+    db: AsyncSession = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ):
     """
@@ -185,8 +192,10 @@ async def deep_research_endpoint(
     Returns a stream of JSON events:
     - {"type": "status", "message": "..."}
     - {"type": "token", "content": "..."}
+    - {"type": "queue", "endpoint": "...", "position": n} while waiting for the GPU (0 = admitted)
     """
     try:
+        priority = await deps.get_request_priority(db, current_user, request.appointment_id)
         stream = run_deep_research(
             image_url=request.image_url,
             audio_url=request.audio_url,
@@ -194,7 +203,7 @@ async def deep_research_endpoint(
             vision_prompt=request.vision_prompt
         )
         # Using text/event-stream for SSE compatibility
-        return StreamingResponse(stream, media_type="text/event-stream")
+        return StreamingResponse(admitted_stream(stream, priority), media_type="text/event-stream")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -378,12 +387,14 @@ class MedicalSummarizeRequest(BaseModel):
     (MedGemma + Indian Skin LoRA hosted on HuggingFace Space).
     Default (False) uses Gemini Vision for general lab reports, prescriptions, and X-rays.
     """
+    appointment_id: Optional[str] = None   # Used for GPU queue priority (appointment severity)
 
 from app.agent.medicalSummarizer import stream_medical_summary
 
 @router.post("/summarize-medical-report")
 async def summarize_medical_report_endpoint(
     request: MedicalSummarizeRequest,
+    db: AsyncSession = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ):
     """
@@ -391,49 +402,121 @@ async def summarize_medical_report_endpoint(
     - **General** (default): Lab reports, prescriptions, X-rays — analyzed by Gemini Vision.
     - **Skin Specialist** (use_skin_specialist=true): Dermatology images — analyzed by
       MedGemma + Indian Skin LoRA (Fitzpatrick III-VI, tropical conditions).
-    Returns: Server-Sent Events (SSE).
+    Returns: Server-Sent Events (SSE), including queue-position events while waiting for the GPU.
     """
     try:
+        priority = await deps.get_request_priority(db, current_user, request.appointment_id)
         stream = stream_medical_summary(
             image_url=request.image_url,
             use_skin_specialist=request.use_skin_specialist
         )
-        return StreamingResponse(stream, media_type="text/event-stream")
+        return StreamingResponse(admitted_stream(stream, priority), media_type="text/event-stream")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 class HearEmbedRequest(BaseModel):
     audio_url: str
+    patient_id: Optional[str] = None     # If set, the embedding is stored for similarity search
+    recording_id: Optional[str] = None   # Defaults to the audio URL
 
 from app.agent.LLM.llm import get_hear_model
+from app.utils.audio import normalize_wav
+from app.core.http import http_pool, UnsafeURL
+from app.core.embedding_store import hear_store
+from app.core.hear_anomaly import hear_anomaly
+from app.crud.patient import patient as crud_patient
+
+async def _embed_audio_url(audio_url: str) -> list[float]:
+    try:
+        raw = await http_pool.fetch_bytes(audio_url)
+    except UnsafeURL as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    audio_bytes = await asyncio.to_thread(normalize_wav, raw)
+    embedding = await get_hear_model().embed(audio_bytes, filename="patient_audio.wav")
+    if not embedding:
+        raise HTTPException(status_code=502, detail="HeAR model returned empty embedding. Check audio URL and HF Space status.")
+    return embedding
+
 
 @router.post("/hear-embed")
 async def hear_embed_endpoint(
     request: HearEmbedRequest,
+    db: AsyncSession = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ):
     """
     Generate a HeAR (Health Acoustic Representation) embedding from an audio URL.
     HeAR captures acoustic health signals — coughs, breathing patterns, cardiac sounds.
-    Returns: {"embeddings": [...], "dim": int}
-    Useful for downstream acoustic anomaly detection or similarity search.
+    With `patient_id`, the embedding is also stored under (patient_id, recording_id)
+    for /hear-similar and /hear-history, and joins the anomaly-scoring population;
+    this requires access to the patient (the patient, staff of their hospital, or a super admin).
+    Returns: {"embeddings": [...], "dim": int, "stored": bool, "anomaly": {"score", "percentile", "level"}}
     """
-    import httpx as _httpx
+    if request.patient_id and not deps.can_access_patient(current_user, await crud_patient.get(db, id=request.patient_id)):
+        raise HTTPException(status_code=404, detail="Patient not found")
     try:
-        async with _httpx.AsyncClient() as client:
-            resp = await client.get(request.audio_url)
-            resp.raise_for_status()
-            audio_bytes = resp.content
+        with admission_context(await deps.get_request_priority(db, current_user)):
+            embedding = await _embed_audio_url(request.audio_url)
+        anomaly = (await hear_anomaly.assess(embedding))[0]
+        if request.patient_id:
+            await hear_store.add(request.patient_id, request.recording_id or request.audio_url, embedding)
+            await hear_anomaly.refresh()
+        return {"embeddings": embedding, "dim": len(embedding), "stored": bool(request.patient_id), "anomaly": anomaly}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        hear = get_hear_model()
-        embedding = await hear.embed(audio_bytes, filename="patient_audio.wav")
 
-        if not embedding:
-            raise HTTPException(status_code=502, detail="HeAR model returned empty embedding. Check audio URL and HF Space status.")
+class HearSimilarRequest(BaseModel):
+    audio_url: str
+    patient_id: Optional[str] = None   # Only search this patient's recordings
+    k: int = Field(5, ge=1, le=100)
+
 
-        return {"embeddings": embedding, "dim": len(embedding)}
+@router.post("/hear-similar")
+async def hear_similar_endpoint(
+    request: HearSimilarRequest,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+):
+    """
+    Find stored recordings acoustically similar to a new cough/breath sample.
+    Only recordings of patients the caller may access are searched (all of their
+    hospital's patients for staff, their own for a patient).
+    Returns the top-k matches by cosine similarity of their HeAR embeddings:
+    {"matches": [{"patient_id", "recording_id", "created_at", "score"}]}
+    """
+    allowed = await deps.accessible_patient_ids(db, current_user)
+    if request.patient_id:
+        if not deps.can_access_patient(current_user, await crud_patient.get(db, id=request.patient_id)):
+            raise HTTPException(status_code=404, detail="Patient not found")
+        allowed = {request.patient_id}
+    if allowed is not None and not allowed:
+        return {"matches": []}
+    try:
+        with admission_context(await deps.get_request_priority(db, current_user)):
+            embedding = await _embed_audio_url(request.audio_url)
+        matches = await hear_store.search(embedding, k=request.k, patient_ids=allowed)
+        return {"matches": matches}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/hear-history/{patient_id}")
+async def hear_history_endpoint(
+    patient_id: str,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+):
+    """
+    A patient's stored recordings, oldest first, with cosine similarity of each to the
+    previous recording and to the first one (baseline), for longitudinal comparison.
+    Requires access to the patient.
+    """
+    if not deps.can_access_patient(current_user, await crud_patient.get(db, id=patient_id)):
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return {"patient_id": patient_id, "recordings": await hear_store.history(patient_id)}
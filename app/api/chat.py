@@ -1,25 +1,117 @@
 from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
 from jose import jwt, JWTError
+import asyncio
 import json
+import logging
 
 from app.api import deps
 from app.models.user import User, UserRole
-from app.models.doctor import Doctor
-from app.models.patient import Patient
-from app.models.appointment import Appointment
 from app.crud.doctor_patient_chat import chat as crud_chat
-from app.schemas.doctor_patient_chat import ChatMessageResponse, ChatContact, ChatMessageCreate
+from app.crud.conversation import conversation as crud_conversation
+from app.schemas.doctor_patient_chat import ChatMessageResponse, ChatContact, ChatMessageCreate, ChatReadReceipt
 from app.core import security
 from app.core.config import settings
+from app.core.backplane import Backplane, create_backplane
+from app.core.chat_writer import chat_writer
+from app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+class SocketSender:
+    """
+    Outbound side of one socket: a bounded queue drained by its own writer task, so a
+    stalled connection never delays delivery to the user's other devices or the sender's echo.
+
+    When the queue is full the slow-consumer policy applies:
+    - "drop_oldest": discard the oldest queued message (counted in `dropped`)
+    - "disconnect":  close the socket; the client reconnects and catches up via history
+    Idle sockets receive {"type": "ping"} every `heartbeat_interval` seconds.
+    """
+    def __init__(self, websocket: WebSocket, *, max_queue: int, policy: str, send_timeout: float, heartbeat_interval: float, on_close=None):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.on_close = on_close
+        self.dropped = 0
+        self.closed = False
+        self.task = asyncio.create_task(self._run())
+
+    def offer(self, message: dict) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+        if self.policy == "drop_oldest":
+            self.queue.get_nowait()
+            self.queue.put_nowait(message)
+            self.dropped += 1
+            return True
+        self._close(code=1013, reason="Slow consumer") # 1013: try again later
+        return False
+
+    async def _run(self):
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(self.queue.get(), timeout=self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    message = {"type": "ping"}
+                await asyncio.wait_for(self.websocket.send_json(message), timeout=self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self._close(code=1013, reason="Send timeout")
+        except Exception:
+            self._close()
+
+    def _close(self, code: int = 1000, reason: str = ""):
+        if self.closed:
+            return
+        self.closed = True
+        if code != 1000:
+            logger.warning(f"Closing chat socket: {reason}")
+            asyncio.create_task(self._close_socket(code, reason))
+        if self.on_close:
+            self.on_close(self, code != 1000)
+
+    async def _close_socket(self, code: int, reason: str):
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+    def cancel(self):
+        self.closed = True
+        self.task.cancel()
+
 class ConnectionManager:
-    def __init__(self):
+    """
+    Tracks this worker's sockets. Messages are delivered to local sockets directly and
+    published on the backplane so workers holding the recipient's other sockets deliver too.
+    """
+    def __init__(self, backplane: Backplane | None = None):
         self.active_connections: dict[str, list[WebSocket]] = {}
+        self.senders: dict[WebSocket, SocketSender] = {}
+        self.backplane = backplane or create_backplane(settings.CHAT_BACKPLANE_URL)
+        self.slow_disconnects = 0
+        self._dropped_closed = 0 # Drops counted on senders that are gone
+
+    async def start(self):
+        await self.backplane.start(self.deliver_local)
+
+    async def stop(self):
+        for sender in list(self.senders.values()):
+            sender.cancel()
+        await self.backplane.stop()
 
     async def connect(self, user_id: str, websocket: WebSocket):
         await websocket.accept()
@@ -27,22 +119,66 @@ class ConnectionManager:
             self.active_connections[user_id] = []
         self.active_connections[user_id].append(websocket)
 
+        def _on_close(sender: SocketSender, slow: bool):
+            if slow:
+                self.slow_disconnects += 1
+            self.disconnect(user_id, websocket)
+
+        self.senders[websocket] = SocketSender(
+            websocket,
+            max_queue=settings.CHAT_SEND_QUEUE_SIZE,
+            policy=settings.CHAT_SLOW_CONSUMER_POLICY,
+            send_timeout=settings.CHAT_SEND_TIMEOUT_S,
+            heartbeat_interval=settings.CHAT_HEARTBEAT_S,
+            on_close=_on_close,
+        )
+
     def disconnect(self, user_id: str, websocket: WebSocket):
+        sender = self.senders.pop(websocket, None)
+        if sender:
+            self._dropped_closed += sender.dropped
+            sender.cancel()
         if user_id in self.active_connections:
-            self.active_connections[user_id].remove(websocket)
+            if websocket in self.active_connections[user_id]:
+                self.active_connections[user_id].remove(websocket)
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
 
+    async def deliver_local(self, user_id: str, message: dict):
+        # Non-blocking: each socket's writer task does the actual send
+        for connection in list(self.active_connections.get(user_id, [])):
+            sender = self.senders.get(connection)
+            if sender:
+                sender.offer(message)
+
+    def metrics(self) -> dict:
+        depths = [s.queue.qsize() for s in self.senders.values()]
+        return {
+            "users": len(self.active_connections),
+            "sockets": len(self.senders),
+            "send_queue_depth_total": sum(depths),
+            "send_queue_depth_max": max(depths, default=0),
+            "dropped_messages_total": self._dropped_closed + sum(s.dropped for s in self.senders.values()),
+            "slow_consumer_disconnects_total": self.slow_disconnects,
+        }
+
     async def send_personal_message(self, message: dict, user_id: str):
-        if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except:
-                    pass
+        await self.deliver_local(user_id, message)
+        try:
+            await self.backplane.publish(user_id, message)
+        except Exception as e:
+            logger.error(f"Chat backplane publish failed: {e}")
 
 manager = ConnectionManager()
 
+async def _mark_read(reader_id: str, contact_id: str, up_to_id: int, db: AsyncSession) -> dict:
+    marked = await crud_chat.mark_read(db, reader_id=reader_id, contact_id=contact_id, up_to_id=up_to_id)
+    receipt = {"type": "read", "reader_id": reader_id, "contact_id": contact_id, "up_to_id": up_to_id}
+    # Tell the sender their messages were read, and the reader's other devices to clear the badge
+    await manager.send_personal_message(receipt, contact_id)
+    await manager.send_personal_message(receipt, reader_id)
+    return {"contact_id": contact_id, "up_to_id": up_to_id, "marked": marked}
+
 async def get_ws_user(token: str, db: AsyncSession) -> User | None:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
@@ -59,9 +195,10 @@ async def get_ws_user(token: str, db: AsyncSession) -> User | None:
 async def websocket_chat_endpoint(
     websocket: WebSocket,
     token: str = Query(...),
-    db: AsyncSession = Depends(deps.get_db)
 ):
-    user = await get_ws_user(token, db)
+    # Short-lived session for auth only; messages are persisted by the shared group-commit writer
+    async with SessionLocal() as db:
+        user = await get_ws_user(token, db)
     if not user:
         await websocket.close(code=1008) # Policy violation
         return
@@ -71,19 +208,19 @@ async def websocket_chat_endpoint(
         while True:
             data = await websocket.receive_text()
             message_data = json.loads(data)
+
+            if message_data.get("type") == "read":
+                # {"type": "read", "contact_id": "...", "up_to_id": N}
+                if message_data.get("contact_id") and message_data.get("up_to_id") is not None:
+                    async with SessionLocal() as db:
+                        await _mark_read(user.id, message_data["contact_id"], int(message_data["up_to_id"]), db)
+                continue
+
             receiver_id = message_data.get("receiver_id")
             message_text = message_data.get("message")
             
             if receiver_id and message_text:
-                from app.models.doctor_patient_chat import DoctorPatientChat
-                new_msg = DoctorPatientChat(
-                    sender_id=user.id,
-                    receiver_id=receiver_id,
-                    message=message_text
-                )
-                db.add(new_msg)
-                await db.commit()
-                await db.refresh(new_msg)
+                new_msg = await chat_writer.submit(user.id, receiver_id, message_text)
 
                 msg_response = {
                     "id": new_msg.id,
@@ -93,6 +230,9 @@ async def websocket_chat_endpoint(
                     "is_read": new_msg.is_read,
                     "created_at": new_msg.created_at.isoformat()
                 }
+                if message_data.get("client_id"):
+                    # Lets the sender match the ack (assigned id) to its optimistic message
+                    msg_response["client_id"] = message_data["client_id"]
 
                 # Send strictly to receiver
                 await manager.send_personal_message(msg_response, receiver_id)
@@ -111,15 +251,39 @@ async def get_history(
     contact_id: str,
     db: AsyncSession = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
+    before_id: int | None = Query(None, description="Page backwards: messages older than this id"),
+    after_id: int | None = Query(None, description="Catch up: messages newer than this id"),
     skip: int = 0,
-    limit: int = 100
+    limit: int = Query(100, ge=1, le=500)
 ) -> Any:
     # Authorization checks can be added here to guarantee they have an appointment
     messages = await crud_chat.get_chat_history(
-        db, user1_id=current_user.id, user2_id=contact_id, skip=skip, limit=limit
+        db, user1_id=current_user.id, user2_id=contact_id,
+        before_id=before_id, after_id=after_id, skip=skip, limit=limit
     )
     return messages
 
+@router.post("/read/{contact_id}", response_model=ChatReadReceipt)
+async def mark_messages_read(
+    contact_id: str,
+    up_to_id: int = Query(..., ge=0),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Mark every message received from contact_id with id <= up_to_id as read.
+    """
+    return await _mark_read(current_user.id, contact_id, up_to_id, db)
+
+@router.get("/metrics")
+async def get_chat_metrics(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Connection and send-queue metrics for this worker.
+    """
+    return manager.metrics()
+
 @router.get("/contacts", response_model=List[ChatContact])
 async def get_contacts(
     db: AsyncSession = Depends(deps.get_db),
@@ -128,81 +292,6 @@ async def get_contacts(
     """
     Returns the list of specific contacts the user is allowed to chat with.
     Patients get doctors they booked. Doctors get patients who booked them.
+    Ordered by most recent conversation, served from the conversations summary.
     """
-    contacts = []
-    contact_user_ids = set()
-    
-    if current_user.role == UserRole.PATIENT:
-        # Get patient profile
-        query_patient = select(Patient).where(Patient.user_id == current_user.id)
-        res_patient = await db.execute(query_patient)
-        patient = res_patient.scalars().first()
-        if patient:
-            query_appts = select(Appointment).where(Appointment.patient_id == patient.id)
-            res_appts = await db.execute(query_appts)
-            appts = res_appts.scalars().all()
-            
-            doc_ids = list(set([a.doctor_id for a in appts]))
-            if doc_ids:
-                query_docs = select(Doctor).where(Doctor.id.in_(doc_ids))
-                res_docs = await db.execute(query_docs)
-                doctors = res_docs.scalars().all()
-                for doc in doctors:
-                    if doc.user_id:
-                        contact_user_ids.add(doc.user_id)
-                        
-    elif current_user.role == UserRole.DOCTOR:
-        # Get doctor profile
-        query_doc = select(Doctor).where(Doctor.user_id == current_user.id)
-        res_doc = await db.execute(query_doc)
-        doctor = res_doc.scalars().first()
-        if doctor:
-            query_appts = select(Appointment).where(Appointment.doctor_id == doctor.id)
-            res_appts = await db.execute(query_appts)
-            appts = res_appts.scalars().all()
-            
-            pat_ids = list(set([a.patient_id for a in appts]))
-            if pat_ids:
-                query_pats = select(Patient).where(Patient.id.in_(pat_ids))
-                res_pats = await db.execute(query_pats)
-                patients = res_pats.scalars().all()
-                for pat in patients:
-                    if pat.user_id:
-                        contact_user_ids.add(pat.user_id)
-                        
-    # For now, admins might see everyone or no one. Let's keep it empty for admin for simple MVP
-
-    from app.models.hospital import Hospital
-    
-    if contact_user_ids:
-        query_users = select(User).where(User.id.in_(list(contact_user_ids)))
-        res_users = await db.execute(query_users)
-        users = res_users.scalars().all()
-        
-        for u in users:
-            # Check last message
-            last_msg = await crud_chat.get_last_message(db, user1_id=current_user.id, user2_id=u.id)
-            
-            # Additional logic to fetch specialization / hospital if doctor
-            specialization = None
-            h_name = None
-            if u.role == UserRole.DOCTOR:
-                q_d = select(Doctor).where(Doctor.user_id == u.id)
-                d_obj = (await db.execute(q_d)).scalars().first()
-                if d_obj:
-                    specialization = d_obj.specialization
-                    if d_obj.hospital_id:
-                        h = await db.get(Hospital, d_obj.hospital_id)
-                        h_name = h.name if h else None
-            
-            contacts.append({
-                "id": u.id,
-                "full_name": u.full_name or "Unknown User",
-                "role": u.role,
-                "image": u.image,
-                "hospital_name": h_name,
-                "specialization": specialization,
-                "last_message": last_msg
-            })
-            
-    return contacts
+    return await crud_conversation.get_contacts(db, user=current_user)
@@ -6,6 +6,7 @@ from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core import security
 from app.core.config import settings
+from app.core.admission import Priority, priority_for
 from app.core.database import get_db
 from app.crud.user import user as crud_user
 from app.models.user import User, UserRole
@@ -66,3 +67,71 @@ def get_current_doctor(
             status_code=403, detail="Access forbidden: Doctor role required"
         )
     return current_user
+
+# Hospital staff who may act on any patient of their hospital
+STAFF_ROLES = {
+    UserRole.SUPER_ADMIN.value,
+    UserRole.HOSPITAL_ADMIN.value,
+    UserRole.DOCTOR.value,
+    UserRole.NURSE.value,
+}
+
+def can_access_patient(user: User, patient) -> bool:
+    """The patient themselves, staff of the patient's hospital, or a super admin."""
+    if patient is None:
+        return False
+    if user.role == UserRole.SUPER_ADMIN.value or patient.user_id == user.id:
+        return True
+    return user.role in STAFF_ROLES and bool(user.hospital_id) and patient.hospital_id == user.hospital_id
+
+async def accessible_patient_ids(db: AsyncSession, user: User) -> Optional[set]:
+    """Ids of the patients `can_access_patient` allows for this user (None = all patients)."""
+    from sqlalchemy import select, or_
+    from app.models.patient import Patient
+
+    if user.role == UserRole.SUPER_ADMIN.value:
+        return None
+    condition = Patient.user_id == user.id
+    if user.role in STAFF_ROLES and user.hospital_id:
+        condition = or_(condition, Patient.hospital_id == user.hospital_id)
+    result = await db.execute(select(Patient.id).where(condition))
+    return set(result.scalars().all())
+
+async def is_appointment_participant(db: AsyncSession, user: User, appointment) -> bool:
+    """True if the user is the appointment's patient, doctor or assigned nurse."""
+    from app.models.doctor import Doctor
+    from app.models.patient import Patient
+
+    if appointment is None:
+        return False
+    if appointment.nurse_id == user.id:
+        return True
+    patient = await db.get(Patient, appointment.patient_id)
+    if patient is not None and patient.user_id == user.id:
+        return True
+    doctor = await db.get(Doctor, appointment.doctor_id)
+    return doctor is not None and doctor.user_id == user.id
+
+async def get_request_priority(
+    db: AsyncSession, user: User, appointment_id: Optional[str] = None
+) -> Priority:
+    """
+    Admission priority for Space calls made on behalf of this request: the more urgent
+    of the appointment's severity and the caller's role. The severity only counts if the
+    caller takes part in the appointment or is staff of the patient's hospital, so an
+    arbitrary critical appointment id cannot be used to jump the queue.
+    """
+    from app.models.appointment import Appointment
+    from app.models.patient import Patient
+
+    severity = None
+    if appointment_id:
+        appointment = await db.get(Appointment, appointment_id)
+        if appointment is not None:
+            trusted = user.role == UserRole.SUPER_ADMIN.value
+            if not trusted and user.role in STAFF_ROLES and user.hospital_id:
+                patient = await db.get(Patient, appointment.patient_id)
+                trusted = patient is not None and patient.hospital_id == user.hospital_id
+            if trusted or await is_appointment_participant(db, user, appointment):
+                severity = appointment.severity
+    return priority_for(severity=severity, role=user.role)
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from typing import List, Optional
 from app.api import deps
+from app.core.config import settings
+from app.core.database import SessionLocal
 from app.models import document
+from app.models.appointment import Appointment
+from app.models.user import UserRole
 from app.schemas import document as doc_schema
 from app.utils.file import upload_file_to_supabase
+from app.agent.LLM.llm import get_siglip_model, SIGLIP_SCREENING_CANDIDATES
+from app.core.admission import admission_context, Priority
+from datetime import datetime, timezone
 import logging
 
 router = APIRouter()
@@ -13,6 +20,7 @@ logger = logging.getLogger(__name__)
 
 @router.post("/upload", response_model=doc_schema.Document)
 async def upload_document(
+    background_tasks: BackgroundTasks,
     title: str = Form(...),
     appointment_id: Optional[str] = Form(None),
     file: UploadFile = File(...),
@@ -21,7 +29,8 @@ async def upload_document(
 ):
     """
     Upload a document (PDF, Image, etc) for the current user.
-    Optionally link to an appointment.
+    Optionally link to an appointment. Images are screened with MedSigLIP in the
+    background (SIGLIP_CLASSIFY_ON_UPLOAD) and the result stored on the document.
     """
     logger.info(f"Uploading document '{title}' for user {current_user.id}")
     
@@ -59,6 +68,9 @@ async def upload_document(
     db.add(db_doc)
     await db.commit()
     await db.refresh(db_doc)
+
+    if settings.SIGLIP_CLASSIFY_ON_UPLOAD and _is_image(db_doc):
+        background_tasks.add_task(_classify_uploaded, db_doc.id)
     
     return db_doc
 
@@ -88,3 +100,144 @@ async def get_appointment_documents(
     result = await db.execute(query)
     docs = result.scalars().all()
     return docs
+
+
+def _labelset_key(candidates: List[str]) -> str:
+    return "|".join(candidates)
+
+def _is_image(doc: document.Document) -> bool:
+    return (doc.file_type or "").startswith("image/")
+
+async def _can_access_appointment(db: Session, user, appointment_id: Optional[str], seen: dict) -> bool:
+    if not appointment_id:
+        return False
+    if appointment_id not in seen:
+        appointment = await db.get(Appointment, appointment_id)
+        seen[appointment_id] = await deps.is_appointment_participant(db, user, appointment)
+    return seen[appointment_id]
+
+async def _can_access_document(db: Session, user, doc: document.Document, seen: dict) -> bool:
+    """Uploader, a participant of the document's appointment, or a super admin."""
+    if user.role == UserRole.SUPER_ADMIN.value or doc.user_id == user.id:
+        return True
+    return await _can_access_appointment(db, user, doc.appointment_id, seen)
+
+async def _classify(db: Session, targets: list, force: bool) -> List[doc_schema.ClassifyResult]:
+    """
+    targets: (Document or None, image_url, candidates). Results already stored on the
+    document for the same label set are returned as-is; the rest go to SigLIP as one
+    bounded-concurrency batch and are saved back on their documents in one commit.
+    """
+    results: list = [None] * len(targets)
+    pending = []
+    for i, (doc, image_url, candidates) in enumerate(targets):
+        base = dict(document_id=doc.id if doc else None, image_url=image_url, candidates=candidates)
+        stored = (doc.classifications or {}).get(_labelset_key(candidates)) if doc else None
+        if stored and not force:
+            results[i] = doc_schema.ClassifyResult(**base, prediction=stored["prediction"], confidence=stored["confidence"], scores=stored.get("scores"), stored=True)
+        else:
+            pending.append(i)
+
+    outputs = await get_siglip_model().predict_batch([(targets[i][1], targets[i][2]) for i in pending])
+
+    changed = False
+    for i, output in zip(pending, outputs):
+        doc, image_url, candidates = targets[i]
+        base = dict(document_id=doc.id if doc else None, image_url=image_url, candidates=candidates)
+        if not output or "prediction" not in output:
+            results[i] = doc_schema.ClassifyResult(**base, error="Classification failed")
+            continue
+        entry = {
+            "prediction": output["prediction"],
+            "confidence": output.get("confidence"),
+            "scores": output.get("scores") or {output["prediction"]: output.get("confidence")},
+            "classified_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if doc:
+            # Reassign (not mutate) so the JSON column is flagged dirty
+            doc.classifications = {**(doc.classifications or {}), _labelset_key(candidates): entry}
+            db.add(doc)
+            changed = True
+        results[i] = doc_schema.ClassifyResult(**base, prediction=entry["prediction"], confidence=entry["confidence"], scores=entry["scores"])
+
+    if changed:
+        await db.commit()
+    return results
+
+async def _classify_uploaded(document_id: str) -> None:
+    """Background task: screen a newly uploaded image with the default label set."""
+    try:
+        async with SessionLocal() as db:
+            doc = await db.get(document.Document, document_id)
+            if doc is None:
+                return
+            with admission_context(Priority.BATCH):
+                result = (await _classify(db, [(doc, doc.file_url, SIGLIP_SCREENING_CANDIDATES)], force=False))[0]
+        if result.error:
+            logger.warning(f"Upload screening failed for document {document_id}: {result.error}")
+    except Exception as e:
+        logger.error(f"Upload screening error for document {document_id}: {e}")
+
+@router.post("/classify", response_model=List[doc_schema.ClassifyResult])
+async def classify_documents(
+    request: doc_schema.ClassifyBatchRequest,
+    db: Session = Depends(deps.get_db),
+    current_user = Depends(deps.get_current_active_user)
+):
+    """
+    Zero-shot classify many images (documents or bare URLs) with MedSigLIP.
+    Results for documents are stored on the document row; repeated requests for the same
+    label set are answered from it without calling the model (unless force=true).
+    Only documents the caller uploaded or whose appointment they take part in are used;
+    others are reported as not found.
+    """
+    default_candidates = request.candidates or SIGLIP_SCREENING_CANDIDATES
+    doc_ids = {item.document_id for item in request.items if item.document_id}
+    docs = {}
+    if doc_ids:
+        result = await db.execute(select(document.Document).where(document.Document.id.in_(doc_ids)))
+        seen: dict = {}
+        docs = {d.id: d for d in result.scalars().all() if await _can_access_document(db, current_user, d, seen)}
+
+    targets = []
+    errors = {}
+    for i, item in enumerate(request.items):
+        candidates = item.candidates or default_candidates
+        doc = docs.get(item.document_id) if item.document_id else None
+        if item.document_id and not doc:
+            errors[i] = "Document not found"
+        elif doc and not _is_image(doc):
+            errors[i] = "Document is not an image"
+        elif not doc and not item.image_url:
+            errors[i] = "document_id or image_url is required"
+        targets.append((doc, doc.file_url if doc else item.image_url, candidates))
+
+    runnable = [i for i in range(len(targets)) if i not in errors]
+    # Bulk screening yields to interactive reads on the GPU
+    with admission_context(Priority.BATCH):
+        classified = iter(await _classify(db, [targets[i] for i in runnable], request.force))
+    return [
+        doc_schema.ClassifyResult(document_id=request.items[i].document_id, image_url=targets[i][1], candidates=targets[i][2], error=errors[i])
+        if i in errors else next(classified)
+        for i in range(len(targets))
+    ]
+
+@router.post("/appointment/{appointment_id}/classify", response_model=List[doc_schema.ClassifyResult])
+async def classify_appointment_documents(
+    appointment_id: str,
+    request: doc_schema.ClassifyAppointmentRequest,
+    db: Session = Depends(deps.get_db),
+    current_user = Depends(deps.get_current_active_user)
+):
+    """
+    Screen every image document of an appointment (e.g. all uploaded X-rays) in one call.
+    Only the appointment's patient, doctor or nurse (or a super admin) may run it.
+    """
+    if current_user.role != UserRole.SUPER_ADMIN.value and not await _can_access_appointment(db, current_user, appointment_id, {}):
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    candidates = request.candidates or SIGLIP_SCREENING_CANDIDATES
+    query = select(document.Document).where(document.Document.appointment_id == appointment_id).order_by(document.Document.created_at.desc())
+    result = await db.execute(query)
+    docs = [d for d in result.scalars().all() if _is_image(d)]
+    with admission_context(await deps.get_request_priority(db, current_user, appointment_id)):
+        return await _classify(db, [(d, d.file_url, candidates) for d in docs], request.force)
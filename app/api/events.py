@@ -1,17 +1,44 @@
-from typing import Any, List, Optional, Set, Dict
+from typing import Any, AsyncIterator, List, Optional, Set, Dict
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 from datetime import datetime, timezone
+import csv
+import io
+import json
+import zlib
 
 from app.api import deps
+from app.core.database import SessionLocal
 from app.models.user import User, UserRole
 from app.models.event import Event
-from app.schemas.event import EventCreate, Event as EventSchema, EventDataAppend, EventUpdate, EventStatsFilters
+from app.models.event_entry import EventEntry
+from app.models.event_stat import EventStatDimension, NO_HOSPITAL
+from app.crud.event_entry import event_entry as crud_event_entry
+from app.crud.event_stat import event_stat as crud_event_stat
+from app.schemas.event import EventCreate, Event as EventSchema, EventDataAppend, EventUpdate, EventStatsFilters, EventStatRow, EventGraphSeries, EventDataBulkAppend, EventBulkAppendResult, EventAppendResult, EventSummary
+from app.utils.timeseries import Bucket, Aggregate, bucket_series, naive_utc
 
 
 router = APIRouter()
 
+EXPORT_PAGE_SIZE = 1000
+
+async def _load_event(db: AsyncSession, event_id: str) -> Optional[Event]:
+    """
+    Fetch an event with its entries loaded, so the json_data compatibility view can be served.
+    """
+    result = await db.execute(
+        select(Event)
+        .options(selectinload(Event.entries))
+        .where(Event.id == event_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
 @router.get("/stats/filters", response_model=EventStatsFilters)
 async def get_event_filters(
     db: AsyncSession = Depends(deps.get_db),
@@ -19,34 +46,34 @@ async def get_event_filters(
 ) -> Any:
     """
     Get unique filter options (places and keys) for dashboard graphs.
+    Served from the materialized event_stats aggregates, independent of event history size.
     """
-    query = select(Event)
+    hospital_id = None # Super admin sees every hospital
     if current_user.role != UserRole.SUPER_ADMIN.value:
-        if current_user.hospital_id:
-            query = query.join(User, Event.created_by_id == User.id).filter(User.hospital_id == current_user.hospital_id)
-        else:
-            query = query.filter(Event.id == "0") # No access
-            
-    result = await db.execute(query)
-    events = result.scalars().all()
-    
-    unique_places = set()
-    all_keys = set()
-    
-    for event in events:
-        if event.keys:
-            all_keys.update(event.keys)
-        
-        if event.json_data:
-            for entry in event.json_data:
-                place = entry.get("place_name")
-                if place:
-                    unique_places.add(place)
-                    
-    return {
-        "places": sorted(list(unique_places)),
-        "available_keys": sorted(list(all_keys))
-    }
+        if not current_user.hospital_id:
+            return {"places": [], "available_keys": []} # No access
+        hospital_id = current_user.hospital_id
+
+    return await crud_event_stat.get_filters(db, hospital_id=hospital_id)
+
+@router.get("/stats/summary", response_model=List[EventStatRow])
+async def get_event_stats_summary(
+    dimension: Optional[EventStatDimension] = Query(None),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Per-place / per-key entry counts and time ranges for dashboard graphs.
+    """
+    hospital_id = None
+    if current_user.role != UserRole.SUPER_ADMIN.value:
+        if not current_user.hospital_id:
+            return [] # No access
+        hospital_id = current_user.hospital_id
+
+    return await crud_event_stat.get_rows(
+        db, hospital_id=hospital_id, dimension=dimension.value if dimension else None
+    )
 
 @router.get("/stats/graph-data", response_model=List[Dict[str, Any]])
 async def get_event_graph_data(
@@ -58,9 +85,17 @@ async def get_event_graph_data(
     """
     Get detailed entries filtered by place or event for graphical representation.
     """
-    query = select(Event)
+    query = (
+        select(EventEntry.data, Event.event_name, Event.id)
+        .join(Event, EventEntry.event_id == Event.id)
+        .order_by(EventEntry.id.asc())
+    )
     if event_id:
         query = query.where(Event.id == event_id)
+
+    # Apply place filter if provided (indexed column)
+    if place_name:
+        query = query.where(EventEntry.place_name == place_name)
         
     if current_user.role != UserRole.SUPER_ADMIN.value:
         if current_user.hospital_id:
@@ -69,25 +104,71 @@ async def get_event_graph_data(
             query = query.filter(Event.id == "0") # No access
             
     result = await db.execute(query)
-    events = result.scalars().all()
     
     filtered_data = []
-    for event in events:
-        if event.json_data:
-            for entry in event.json_data:
-                # Apply place filter if provided
-                if place_name and entry.get("place_name") != place_name:
-                    continue
-                
-                # Include entry
-                entry_copy = entry.copy()
-                entry_copy["_event_name"] = event.event_name
-                entry_copy["_event_id"] = event.id
-                filtered_data.append(entry_copy)
+    for data, event_name, ev_id in result.all():
+        entry_copy = dict(data)
+        entry_copy["_event_name"] = event_name
+        entry_copy["_event_id"] = ev_id
+        filtered_data.append(entry_copy)
                 
     return filtered_data
 
-@router.get("/", response_model=List[EventSchema])
+@router.get("/stats/graph-series", response_model=EventGraphSeries)
+async def get_event_graph_series(
+    key: str = Query(..., min_length=1),
+    place_name: Optional[str] = Query(None),
+    event_id: Optional[str] = Query(None),
+    bucket: Bucket = Query(Bucket.DAY),
+    aggregate: Aggregate = Query(Aggregate.COUNT),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    max_points: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Time-bucketed aggregate of one key, computed server-side so charts receive
+    at most `max_points` points instead of every raw entry.
+    """
+    query = (
+        select(EventEntry.appended_at, EventEntry.data[key])
+        .join(Event, EventEntry.event_id == Event.id)
+        .where(EventEntry.appended_at.isnot(None))
+    )
+    if event_id:
+        query = query.where(Event.id == event_id)
+    if place_name:
+        query = query.where(EventEntry.place_name == place_name)
+    # Bounds may carry a client offset; stored timestamps are naive UTC
+    start, end = naive_utc(start), naive_utc(end)
+    if start:
+        query = query.where(EventEntry.appended_at >= start)
+    if end:
+        query = query.where(EventEntry.appended_at < end)
+
+    if current_user.role != UserRole.SUPER_ADMIN.value:
+        if current_user.hospital_id:
+            query = query.join(User, Event.created_by_id == User.id).filter(User.hospital_id == current_user.hospital_id)
+        else:
+            query = query.filter(Event.id == "0") # No access
+
+    rows = (await db.execute(query)).all()
+    timestamps = [row[0] for row in rows]
+    values = [row[1] for row in rows]
+
+    series = bucket_series(timestamps, values, bucket=bucket, aggregate=aggregate, max_points=max_points)
+    return {
+        "key": key,
+        "place_name": place_name,
+        "event_id": event_id,
+        "bucket": bucket,
+        "aggregate": aggregate,
+        "total_entries": len(rows),
+        **series,
+    }
+
+@router.get("/", response_model=List[EventSummary])
 async def read_events(
     skip: int = 0,
     limit: int = 100,
@@ -95,9 +176,15 @@ async def read_events(
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Retrieve events.
+    Retrieve events with their record counts. Records are not listed here (they grow
+    without bound); use GET /events/{id} or /events/{id}/export.
     """
-    query = select(Event)
+    counts = (
+        select(EventEntry.event_id, func.count(EventEntry.id).label("entry_count"))
+        .group_by(EventEntry.event_id)
+        .subquery()
+    )
+    query = select(Event, counts.c.entry_count).outerjoin(counts, counts.c.event_id == Event.id)
     if current_user.role != UserRole.SUPER_ADMIN.value:
         if current_user.hospital_id:
             query = query.join(User, Event.created_by_id == User.id).filter(User.hospital_id == current_user.hospital_id)
@@ -106,7 +193,10 @@ async def read_events(
             
     query = query.offset(skip).limit(limit)
     result = await db.execute(query)
-    return result.scalars().all()
+    return [
+        EventSummary.model_validate(event).model_copy(update={"entry_count": entry_count or 0})
+        for event, entry_count in result.all()
+    ]
 
 
 @router.post("/", response_model=EventSchema)
@@ -125,15 +215,16 @@ async def create_event(
     
     event = Event(
         event_name=event_in.event_name,
-        json_data=[], # Initialize empty list
         keys=event_in.keys, # Initialize keys
         created_by_id=current_user.id,
         updated_by_id=current_user.id
     )
     db.add(event)
+    await crud_event_stat.record_keys(
+        db, hospital_id=current_user.hospital_id or NO_HOSPITAL, added=event_in.keys
+    )
     await db.commit()
-    await db.refresh(event)
-    return event
+    return await _load_event(db, event.id)
 
 @router.get("/{event_id}", response_model=EventSchema)
 async def get_event(
@@ -145,22 +236,140 @@ async def get_event(
     """
     Get event by ID.
     """
-    result = await db.execute(select(Event).where(Event.id == event_id))
-    event = result.scalars().first()
+    event = await _load_event(db, event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     return event
 
-@router.patch("/{event_id}/append", response_model=EventSchema)
-async def append_event_data(
+async def _iter_entry_pages(event_id: str, cursor: int, offset: int) -> AsyncIterator[List[EventEntry]]:
+    """
+    Keyset-paginate an event's entries by id. Each page uses its own short-lived
+    session, so a long export never pins a pooled connection.
+    """
+    first = True
+    while True:
+        async with SessionLocal() as db:
+            query = (
+                select(EventEntry)
+                .where(EventEntry.event_id == event_id, EventEntry.id > cursor)
+                .order_by(EventEntry.id.asc())
+                .limit(EXPORT_PAGE_SIZE)
+            )
+            if first and offset:
+                query = query.offset(offset)
+            page = (await db.execute(query)).scalars().all()
+        first = False
+        if not page:
+            return
+        yield page
+        cursor = page[-1].id
+        if len(page) < EXPORT_PAGE_SIZE:
+            return
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+# Leading CSV columns; NDJSON records carry the same fields
+EXPORT_META_COLUMNS = ("_entry_id", "_appended_at", "_appended_by")
+
+async def _export_stream(
+    event_id: str, fmt: str, fields: Optional[List[str]], cursor: int, offset: int, use_gzip: bool
+) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=31) if use_gzip else None # wbits=31 -> gzip container
+
+    def encode(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow([*EXPORT_META_COLUMNS, *fields])
+
+    async for page in _iter_entry_pages(event_id, cursor, offset):
+        for entry in page:
+            if fmt == "csv":
+                writer.writerow([
+                    entry.id, entry.data.get("_appended_at"), entry.data.get("_appended_by"),
+                    *(_csv_value(entry.data.get(f)) for f in fields),
+                ])
+            else:
+                if fields:
+                    record = {f: entry.data.get(f) for f in ("_appended_at", "_appended_by", *fields)}
+                else:
+                    record = dict(entry.data)
+                record["_entry_id"] = entry.id
+                buffer.write(json.dumps(record) + "\n")
+        chunk = encode(buffer.getvalue())
+        buffer.seek(0)
+        buffer.truncate()
+        if chunk:
+            yield chunk
+
+    tail = encode(buffer.getvalue())
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
+
+@router.get("/{event_id}/export")
+async def export_event_data(
     *,
     db: AsyncSession = Depends(deps.get_db),
     event_id: str,
-    data_in: EventDataAppend,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fields: Optional[List[str]] = Query(None),
+    cursor: int = Query(0, ge=0, description="Resume after this _entry_id"),
+    offset: int = Query(0, ge=0, description="Skip this many entries after the cursor"),
+    gzip: bool = Query(False),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Append data to event JSON. (NURSE ONLY)
+    Stream an event's entries as NDJSON or CSV in constant memory.
+    Every record carries its `_entry_id`, `_appended_at` and `_appended_by`; pass the last
+    `_entry_id` received as `cursor` to resume. `fields` must be a subset of Event.keys.
+    Without `fields`, NDJSON exports full records and CSV has a column per event key.
+    """
+    query = select(Event).where(Event.id == event_id)
+    if current_user.role != UserRole.SUPER_ADMIN.value:
+        if current_user.hospital_id:
+            query = query.join(User, Event.created_by_id == User.id).filter(User.hospital_id == current_user.hospital_id)
+        else:
+            query = query.filter(Event.id == "0") # No access
+    event = (await db.execute(query)).scalars().first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    event_keys = list(event.keys or [])
+    if fields:
+        unknown = [f for f in fields if f not in event_keys]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields for this event: {', '.join(unknown)}")
+        selected = fields
+    else:
+        selected = event_keys if format == "csv" else []
+    if format == "csv" and not selected:
+        raise HTTPException(status_code=400, detail="CSV export requires event keys or explicit fields")
+
+    filename = f"event-{event.id}.{format}"
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        _export_stream(event.id, format, selected or None, cursor, offset, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+async def _append_entry(db: AsyncSession, event_id: str, data: Dict[str, Any], current_user: User):
+    """
+    Insert one record (NURSE ONLY) and update the dashboard stats. Returns (event, entry).
     """
     if current_user.role != UserRole.NURSE.value and current_user.role != UserRole.SUPER_ADMIN.value:
          raise HTTPException(
@@ -173,24 +382,138 @@ async def append_event_data(
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
 
-    # Append new data
-    # We must create a new list to ensure SQLAlchemy detects the change (mutation tracking on JSON is tricky)
-    current_data = list(event.json_data) if event.json_data else []
-    
     # Add metadata to the append
-    new_entry = data_in.data.copy()
+    new_entry = data.copy()
     new_entry["_appended_by"] = current_user.id
     new_entry["_appended_at"] = datetime.now(timezone.utc).isoformat()
     
-    current_data.append(new_entry)
+    # Single-row insert into event_entries (no read-modify-write of the whole list)
+    entry = await crud_event_entry.append(db, event_id=event.id, data=new_entry, appended_by_id=current_user.id)
+    hospital_id = await crud_event_stat.hospital_for_event(db, event=event)
+    await crud_event_stat.record_entries(db, hospital_id=hospital_id, entries=[entry])
     
-    event.json_data = current_data
     event.updated_by_id = current_user.id
     
     db.add(event)
     await db.commit()
     await db.refresh(event)
-    return event
+    return event, entry
+
+@router.patch("/{event_id}/append", response_model=EventSchema)
+async def append_event_data(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    event_id: str,
+    data_in: EventDataAppend,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Append data to event JSON. (NURSE ONLY)
+    Returns the whole event including json_data; POST /events/{id}/entries returns only the new record.
+    """
+    event, _ = await _append_entry(db, event_id, data_in.data, current_user)
+    return await _load_event(db, event.id)
+
+@router.post("/{event_id}/entries", response_model=EventAppendResult)
+async def create_event_entry(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    event_id: str,
+    data_in: EventDataAppend,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Append one record. (NURSE ONLY)
+    Returns the event metadata and the stored record, not the full json_data,
+    so the cost of an append does not grow with the event's history.
+    """
+    event, entry = await _append_entry(db, event_id, data_in.data, current_user)
+    return {
+        "id": event.id,
+        "event_name": event.event_name,
+        "keys": event.keys,
+        "created_by_id": event.created_by_id,
+        "updated_by_id": event.updated_by_id,
+        "created_at": event.created_at,
+        "updated_at": event.updated_at,
+        "entry_id": entry.id,
+        "entry": entry.data,
+    }
+
+def _client_timestamp(value: Any) -> Optional[datetime]:
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+@router.post("/{event_id}/append/bulk", response_model=EventBulkAppendResult)
+async def bulk_append_event_data(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    event_id: str,
+    data_in: EventDataBulkAppend,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Append many entries in one transaction. (NURSE ONLY)
+    Each entry carries a client-generated idempotency_key; replays of an already stored key
+    are reported as "duplicate" instead of being inserted again, so offline sync can safely retry.
+    `recorded_at` (or an ISO `_appended_at` in data) keeps the time the entry was collected;
+    entries without one are stamped with the sync time.
+    """
+    if current_user.role != UserRole.NURSE.value and current_user.role != UserRole.SUPER_ADMIN.value:
+         raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only nurses can append data to events"
+        )
+
+    user_id = current_user.id
+    synced_at = datetime.now(timezone.utc)
+    items = []
+    for item in data_in.entries:
+        new_entry = item.data.copy()
+        new_entry["_appended_by"] = user_id
+        # Keep the offline collection time; the sync time is only a fallback
+        recorded_at = item.recorded_at or _client_timestamp(new_entry.get("_appended_at")) or synced_at
+        if recorded_at.tzinfo is None:
+            recorded_at = recorded_at.replace(tzinfo=timezone.utc)
+        new_entry["_appended_at"] = recorded_at.astimezone(timezone.utc).isoformat()
+        items.append((item.idempotency_key, new_entry))
+
+    # A concurrent sync of the same keys can win the unique index race; re-run dedupe once
+    for attempt in range(2):
+        result = await db.execute(select(Event).where(Event.id == event_id))
+        event = result.scalars().first()
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+        hospital_id = await crud_event_stat.hospital_for_event(db, event=event)
+
+        try:
+            results, created = await crud_event_entry.append_many(
+                db, event_id=event_id, items=items, appended_by_id=user_id
+            )
+            await crud_event_stat.record_entries(db, hospital_id=hospital_id, entries=created)
+            if created:
+                event.updated_by_id = user_id
+                db.add(event)
+            await db.commit()
+            break
+        except IntegrityError:
+            await db.rollback()
+            if attempt:
+                raise HTTPException(status_code=409, detail="Conflicting concurrent sync, please retry")
+
+    return {
+        "event_id": event_id,
+        "created": len(created),
+        "duplicates": len(results) - len(created),
+        "results": [
+            {"idempotency_key": key, "status": entry_status, "entry_id": entry_id}
+            for key, entry_status, entry_id in results
+        ],
+    }
 
 @router.put("/{event_id}", response_model=EventSchema)
 async def update_event(
@@ -212,14 +535,23 @@ async def update_event(
     if event_in.event_name is not None:
         event.event_name = event_in.event_name
         
-    if event_in.json_data is not None:
-        event.json_data = event_in.json_data
+    hospital_id = await crud_event_stat.hospital_for_event(db, event=event)
 
     if event_in.keys is not None:
+        old_keys = set(event.keys or [])
+        new_keys = set(event_in.keys)
         event.keys = event_in.keys
+        await crud_event_stat.record_keys(
+            db, hospital_id=hospital_id, added=new_keys - old_keys, removed=old_keys - new_keys
+        )
+
+    if event_in.json_data is not None:
+        # Full replace: counts and time ranges can't be decremented reliably, recompute this hospital
+        await crud_event_entry.replace_for_event(db, event_id=event.id, records=event_in.json_data)
+        await crud_event_stat.rebuild(db, hospital_id=hospital_id)
+
     event.updated_by_id = current_user.id
     
     db.add(event)
     await db.commit()
-    await db.refresh(event)
-    return event
+    return await _load_event(db, event_id)
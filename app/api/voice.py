@@ -1,12 +1,30 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, UploadFile, File
+import asyncio
 import logging
-from app.agent.voiceAgent import transcribe_audio
+from app.agent.voiceAgent import transcribe_audio, SAMPLE_RATE
+from app.core.config import settings
+from app.utils.pipeline import OrderedPipeline
+from app.utils.stitching import TranscriptStitcher
+from app.utils.audio import to_pcm16
+from app.utils.vad import VadSegmenter
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+def _pcm_frames(audio_data: bytes) -> bytes | None:
+    """
+    16 kHz mono int16 PCM for the segmenter, decoded and normalized from a WAV frame.
+    Returns None for anything that is not a parseable WAV (headerless data may be WebM,
+    Ogg/Opus or MP3 just as well as raw PCM), which is then transcribed frame by frame.
+    """
+    if not audio_data.startswith(b"RIFF"):
+        return None
+    pcm = to_pcm16(audio_data, SAMPLE_RATE)
+    return None if pcm is None else pcm.tobytes()
+
+
 import traceback
 
 @router.post("/transcribe")
@@ -33,9 +51,20 @@ async def websocket_transcribe(websocket: WebSocket):
     ─────────
     1. Client connects to  ws://<host>/api/v1/voice/ws/transcribe
     2. Client sends audio chunks as **binary** WebSocket frames 
-       (WAV or raw 16-bit PCM @ 16 kHz).
-    3. Server transcribes each chunk and sends back a JSON message:
-       { "type": "transcription", "text": "...", "chunk_index": N }
+       (WAV or raw 16-bit PCM @ 16 kHz), of any size.
+       WAV frames are normalized to 16 kHz mono, buffered, and cut into utterance-sized
+       segments at pauses (VAD, capped at VOICE_MAX_SEGMENT_S); silence is never
+       transcribed. With VOICE_VAD_ENABLED off, or for frames without a WAV header (raw
+       PCM, WebM, ...), each frame is transcribed as its own chunk.
+    3. Server transcribes up to VOICE_MAX_IN_FLIGHT chunks concurrently and sends back,
+       in chunk order, a JSON message per chunk:
+       { "type": "transcription", "text": "...", "chunk_index": N, "seq": N - 1,
+         "stable": "...", "pending": "..." }
+       Chunks are stitched at their boundaries (repeated words merged; words split across
+       a frame boundary too, but never across VAD segments). "stable" is
+       the text that just became final and should be appended; "pending" is the
+       provisional tail, which may still change with the next chunk.
+       While the window is full the server stops reading frames (backpressure).
     4. Client sends a **text** message "END" to signal end of session.
     5. Server replies with the full conversation transcript:
        { "type": "final", "full_transcript": "...", "total_chunks": N }
@@ -45,7 +74,36 @@ async def websocket_transcribe(websocket: WebSocket):
     logger.info("Voice WebSocket connection accepted.")
 
     conversation_chunks: list[str] = []
-    chunk_index = 0
+    stitcher = TranscriptStitcher()
+    vad_seqs: set[int] = set()  # Chunks cut at silence: no word straddles their boundary
+
+    async def emit(seq: int, transcribed_text: str, error: Exception | None):
+        split_words = seq not in vad_seqs
+        vad_seqs.discard(seq)
+        if error is not None:
+            logger.error(f"Transcription error: {error}")
+            await websocket.send_json({
+                "type": "error",
+                "message": f"Transcription failed: {str(error)}",
+                "seq": seq,
+            })
+            return
+        conversation_chunks.append(transcribed_text)
+        stable, pending = stitcher.add(transcribed_text, split_words=split_words)
+        await websocket.send_json({
+            "type": "transcription",
+            "text": transcribed_text,
+            "chunk_index": len(conversation_chunks),
+            "seq": seq,
+            "stable": " ".join(stable),
+            "pending": " ".join(pending),
+        })
+        logger.info(
+            f"Chunk {seq} transcribed: {transcribed_text[:80]}..."
+        )
+
+    pipeline = OrderedPipeline(transcribe_audio, emit, max_in_flight=settings.VOICE_MAX_IN_FLIGHT)
+    segmenter = VadSegmenter(max_segment_s=settings.VOICE_MAX_SEGMENT_S) if settings.VOICE_VAD_ENABLED else None
 
     try:
         while True:
@@ -56,8 +114,12 @@ async def websocket_transcribe(websocket: WebSocket):
             if "text" in message:
                 text_msg = message["text"].strip().upper()
                 if text_msg == "END":
-                    # Send full transcript and close
-                    full_transcript = " ".join(conversation_chunks)
+                    # Transcribe buffered speech, wait for in-flight chunks, then send full transcript and close
+                    if segmenter:
+                        for segment in segmenter.flush():
+                            vad_seqs.add(await pipeline.submit(segment))
+                    await pipeline.drain()
+                    full_transcript = stitcher.finish()
                     await websocket.send_json({
                         "type": "final",
                         "full_transcript": full_transcript,
@@ -80,6 +142,15 @@ async def websocket_transcribe(websocket: WebSocket):
             # ── Binary audio data ──
             if "bytes" in message:
                 audio_data: bytes = message["bytes"]
+                # WAV decode / resampling and VAD features are CPU work: keep them off the event loop.
+                # One frame at a time, so the segmenter is never used from two threads at once.
+                pcm = await asyncio.to_thread(_pcm_frames, audio_data) if segmenter else None
+
+                if pcm is not None:
+                    # Blocks while VOICE_MAX_IN_FLIGHT segments are outstanding
+                    for segment in await asyncio.to_thread(segmenter.feed, pcm):
+                        vad_seqs.add(await pipeline.submit(segment))
+                    continue
 
                 if len(audio_data) < 100:
                     # Too small to be meaningful audio
@@ -89,26 +160,8 @@ async def websocket_transcribe(websocket: WebSocket):
                     })
                     continue
 
-                try:
-                    transcribed_text = await transcribe_audio(audio_data)
-                    conversation_chunks.append(transcribed_text)
-                    chunk_index += 1
-
-                    await websocket.send_json({
-                        "type": "transcription",
-                        "text": transcribed_text,
-                        "chunk_index": chunk_index,
-                    })
-                    logger.info(
-                        f"Chunk {chunk_index} transcribed: {transcribed_text[:80]}..."
-                    )
-
-                except Exception as e:
-                    logger.error(f"Transcription error: {e}")
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": f"Transcription failed: {str(e)}",
-                    })
+                # Blocks while VOICE_MAX_IN_FLIGHT chunks are outstanding
+                await pipeline.submit(audio_data)
 
     except WebSocketDisconnect:
         logger.info("Voice WebSocket disconnected by client.")
@@ -122,6 +175,7 @@ async def websocket_transcribe(websocket: WebSocket):
         except Exception:
             pass
     finally:
+        await pipeline.cancel()
         try:
             await websocket.close()
         except Exception:
@@ -0,0 +1,233 @@
+"""
+Priority-aware admission control for GPU calls to the HF Space.
+
+Every Space endpoint gets a concurrency limit (ADMISSION_LIMITS, default
+ADMISSION_DEFAULT_LIMIT). A call over the limit waits in a per-endpoint queue ordered by
+priority, then arrival. Priorities come from the appointment severity and/or the
+caller's role (`priority_for`); the most urgent of the two wins. Each waiter has a
+deadline (ADMISSION_DEADLINE_S, per priority) after which it gives up with
+AdmissionTimeout instead of holding a connection open indefinitely.
+
+The priority travels with the request in a context variable, so the model clients in
+llm.py need no extra parameters:
+
+    with admission_context(priority):            # plain endpoints
+        await get_siglip_model().predict_batch(...)
+
+    StreamingResponse(admitted_stream(stream, priority))   # SSE endpoints
+
+`admitted_stream` also interleaves `{"type": "queue", "endpoint", "position"}` events
+into the SSE stream while a call is waiting (position 0 = admitted).
+
+Cache hits and coalesced requests never reach `slot()`, so they are not queued.
+"""
+import asyncio
+import contextlib
+import contextvars
+import enum
+import heapq
+import itertools
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.resilience import SpaceUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(enum.IntEnum):
+    CRITICAL = 0
+    HIGH = 1
+    NORMAL = 2
+    BATCH = 3
+
+
+SEVERITY_PRIORITY = {
+    "critical": Priority.CRITICAL,
+    "high": Priority.HIGH,
+    "medium": Priority.NORMAL,
+    "low": Priority.NORMAL,
+}
+
+ROLE_PRIORITY = {
+    "doctor": Priority.HIGH,
+    "nurse": Priority.HIGH,
+}
+
+
+def priority_for(severity: Optional[str] = None, role: Optional[str] = None) -> Priority:
+    """Most urgent of the appointment severity and the caller's role (NORMAL if neither applies)."""
+    return min(
+        SEVERITY_PRIORITY.get((severity or "").lower(), Priority.NORMAL),
+        ROLE_PRIORITY.get(role or "", Priority.NORMAL),
+    )
+
+
+class AdmissionTimeout(SpaceUnavailable):
+    pass
+
+
+@dataclass
+class _Ticket:
+    priority: Priority
+    on_position: Optional[Callable[[str, int], None]] = None
+
+
+_ticket: contextvars.ContextVar[Optional[_Ticket]] = contextvars.ContextVar("admission_ticket", default=None)
+
+
+@contextlib.contextmanager
+def admission_context(priority: Priority, on_position: Optional[Callable[[str, int], None]] = None):
+    token = _ticket.set(_Ticket(priority, on_position))
+    try:
+        yield
+    finally:
+        _ticket.reset(token)
+
+
+class _Waiter:
+    __slots__ = ("ticket", "future", "position")
+
+    def __init__(self, ticket: _Ticket):
+        self.ticket = ticket
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.position = 0
+
+
+class _EndpointQueue:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.heap: List[tuple] = []  # (priority, seq, waiter)
+        self.admitted = 0
+        self.queued = 0
+        self.timeouts = 0
+        self.max_wait_s = 0.0
+
+
+class AdmissionController:
+    def __init__(self):
+        self._queues: Dict[str, _EndpointQueue] = {}
+        self._seq = itertools.count()
+
+    def _queue(self, endpoint: str) -> _EndpointQueue:
+        if endpoint not in self._queues:
+            limit = settings.ADMISSION_LIMITS.get(endpoint, settings.ADMISSION_DEFAULT_LIMIT)
+            self._queues[endpoint] = _EndpointQueue(limit)
+        return self._queues[endpoint]
+
+    def _report_positions(self, endpoint: str, queue: _EndpointQueue) -> None:
+        for position, (_, _, waiter) in enumerate(sorted(queue.heap), start=1):
+            if waiter.position != position and waiter.ticket.on_position:
+                waiter.ticket.on_position(endpoint, position)
+            waiter.position = position
+
+    def _remove(self, queue: _EndpointQueue, waiter: _Waiter) -> None:
+        queue.heap = [entry for entry in queue.heap if entry[2] is not waiter]
+        heapq.heapify(queue.heap)
+
+    def _release(self, endpoint: str) -> None:
+        queue = self._queues[endpoint]
+        queue.active -= 1
+        while queue.heap and queue.active < queue.limit:
+            _, _, waiter = heapq.heappop(queue.heap)
+            if waiter.future.done():
+                continue
+            queue.active += 1
+            waiter.future.set_result(None)
+        self._report_positions(endpoint, queue)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, endpoint: str) -> AsyncIterator[None]:
+        """Hold one of the endpoint's concurrency slots for the duration of the block."""
+        ticket = _ticket.get() or _Ticket(Priority.NORMAL)
+        queue = self._queue(endpoint)
+
+        if queue.active < queue.limit and not queue.heap:
+            queue.active += 1
+        else:
+            waiter = _Waiter(ticket)
+            heapq.heappush(queue.heap, (ticket.priority, next(self._seq), waiter))
+            queue.queued += 1
+            self._report_positions(endpoint, queue)
+            deadline = settings.ADMISSION_DEADLINE_S.get(ticket.priority.name.lower(), 60)
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), timeout=deadline)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    # Admitted at the same moment; hand the slot on
+                    self._release(endpoint)
+                else:
+                    waiter.future.cancel()
+                    self._remove(queue, waiter)
+                    self._report_positions(endpoint, queue)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                queue.timeouts += 1
+                raise AdmissionTimeout(f"{endpoint}: not admitted within {deadline}s ({ticket.priority.name})")
+            queue.max_wait_s = max(queue.max_wait_s, time.monotonic() - started)
+            if ticket.on_position:
+                ticket.on_position(endpoint, 0)
+
+        queue.admitted += 1
+        try:
+            yield
+        finally:
+            self._release(endpoint)
+
+    def metrics(self) -> dict:
+        return {
+            endpoint: {
+                "limit": queue.limit,
+                "active": queue.active,
+                "waiting": len(queue.heap),
+                "waiting_by_priority": {
+                    p.name.lower(): sum(1 for entry in queue.heap if entry[0] == p) for p in Priority
+                },
+                "admitted": queue.admitted,
+                "queued": queue.queued,
+                "timeouts": queue.timeouts,
+                "max_wait_s": round(queue.max_wait_s, 3),
+            }
+            for endpoint, queue in self._queues.items()
+        }
+
+
+admission = AdmissionController()
+
+
+_DONE = object()
+
+
+async def admitted_stream(stream: AsyncIterator[str], priority: Priority) -> AsyncIterator[str]:
+    """
+    Runs an SSE generator with the given priority and interleaves queue-position events
+    for any Space call it has to wait for.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+
+    def on_position(endpoint: str, position: int) -> None:
+        events.put_nowait(f"data: {json.dumps({'type': 'queue', 'endpoint': endpoint, 'position': position})}\n\n")
+
+    async def pump():
+        try:
+            async for chunk in stream:
+                events.put_nowait(chunk)
+        except Exception as e:
+            logger.error(f"Admitted stream failed: {e}")
+            events.put_nowait(f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n")
+        finally:
+            events.put_nowait(_DONE)
+
+    with admission_context(priority, on_position):
+        task = asyncio.create_task(pump())
+    try:
+        while (chunk := await events.get()) is not _DONE:
+            yield chunk
+    finally:
+        task.cancel()
@@ -0,0 +1,131 @@
+"""
+Pub/sub backplane for routing chat messages between uvicorn workers / replicas.
+
+Every worker publishes outgoing messages to the backplane and delivers the messages it
+receives to the sockets it holds locally. Select the implementation with CHAT_BACKPLANE_URL:
+
+- ""            → InProcessBackplane (single worker, tests)
+- "redis://..." → RedisBackplane (any number of workers / replicas)
+"""
+import asyncio
+import json
+import logging
+import uuid
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# handler(user_id, message)
+DeliveryHandler = Callable[[str, dict], Awaitable[None]]
+
+
+class Backplane:
+    """Interface: publish a message for a user, and call the handler for messages from other workers."""
+
+    def __init__(self):
+        # Identifies this worker so it can skip its own publishes (those are delivered locally)
+        self.origin = uuid.uuid4().hex
+        self._handler: Optional[DeliveryHandler] = None
+
+    async def start(self, handler: DeliveryHandler) -> None:
+        self._handler = handler
+
+    async def publish(self, user_id: str, message: dict) -> None:
+        raise NotImplementedError
+
+    async def stop(self) -> None:
+        self._handler = None
+
+
+class InProcessBackplane(Backplane):
+    """
+    Delivers between backplanes sharing the same hub inside one process.
+    Each ConnectionManager stands in for a worker, which lets tests exercise cross-worker routing.
+    """
+
+    def __init__(self, hub: Optional[List["InProcessBackplane"]] = None):
+        super().__init__()
+        self.hub = hub if hub is not None else []
+
+    async def start(self, handler: DeliveryHandler) -> None:
+        await super().start(handler)
+        if self not in self.hub:
+            self.hub.append(self)
+
+    async def publish(self, user_id: str, message: dict) -> None:
+        for peer in list(self.hub):
+            if peer is not self and peer._handler is not None:
+                await peer._handler(user_id, message)
+
+    async def stop(self) -> None:
+        if self in self.hub:
+            self.hub.remove(self)
+        await super().stop()
+
+
+class RedisBackplane(Backplane):
+    """
+    Redis PUBLISH/SUBSCRIBE on a single channel. Every worker receives every message and
+    delivers it only if it holds a socket for the recipient, which keeps subscription
+    management trivial for the expected number of workers.
+    """
+
+    def __init__(self, url: str, channel: str = "chat:messages"):
+        super().__init__()
+        self.url = url
+        self.channel = channel
+        self._redis = None
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def start(self, handler: DeliveryHandler) -> None:
+        import redis.asyncio as aioredis  # Optional dependency, only needed with a redis:// URL
+
+        await super().start(handler)
+        self._redis = aioredis.from_url(self.url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.channel)
+        self._reader = asyncio.create_task(self._read_loop())
+        logger.info(f"Chat backplane connected to Redis channel '{self.channel}'")
+
+    async def _read_loop(self) -> None:
+        while True:
+            try:
+                async for raw in self._pubsub.listen():
+                    envelope = json.loads(raw["data"])
+                    if envelope.get("origin") == self.origin or self._handler is None:
+                        continue
+                    try:
+                        await self._handler(envelope["user_id"], envelope["message"])
+                    except Exception as e:
+                        logger.error(f"Chat backplane delivery error: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Chat backplane subscription error, reconnecting: {e}")
+                await asyncio.sleep(1.0)
+
+    async def publish(self, user_id: str, message: dict) -> None:
+        envelope = {"origin": self.origin, "user_id": user_id, "message": message}
+        await self._redis.publish(self.channel, json.dumps(envelope, default=str))
+
+    async def stop(self) -> None:
+        if self._reader:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self._pubsub:
+            await self._pubsub.aclose()
+        if self._redis:
+            await self._redis.aclose()
+        await super().stop()
+
+
+def create_backplane(url: str) -> Backplane:
+    if not url:
+        return InProcessBackplane()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackplane(url)
+    raise ValueError(f"Unsupported CHAT_BACKPLANE_URL scheme: {url}")
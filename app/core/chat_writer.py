@@ -0,0 +1,120 @@
+"""
+Write-behind group commit for chat messages.
+
+WebSocket handlers submit messages to a shared queue instead of committing one by one.
+A single background task drains the queue and commits everything that arrived within
+CHAT_WRITE_FLUSH_MS (or up to CHAT_WRITE_BATCH_SIZE messages) in one transaction, together
+with the conversations summary, then resolves each submitter's future with the stored row
+(assigned id and created_at). If the batch fails, each message is retried in its own
+transaction so only the offending submit sees the error.
+"""
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.doctor_patient_chat import DoctorPatientChat
+from app.crud.conversation import conversation as crud_conversation
+
+logger = logging.getLogger(__name__)
+
+_Pending = Tuple[DoctorPatientChat, asyncio.Future]
+
+
+class ChatWriteBehind:
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.005):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush whatever is queued, then stop the writer task."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        try:
+            await self._task
+        finally:
+            self._task = None
+
+    async def submit(self, sender_id: str, receiver_id: str, message: str) -> DoctorPatientChat:
+        """Queue a message and wait until it is committed. Returns the persisted (detached) row."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        row = DoctorPatientChat(sender_id=sender_id, receiver_id=receiver_id, message=message)
+        await self._queue.put((row, future))
+        return await future
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch: List[_Pending] = [item]
+
+            # Collect more messages until the batch is full or the flush window closes
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._commit(batch)
+
+        # Drain anything submitted after the stop marker
+        leftover: List[_Pending] = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                leftover.append(item)
+        if leftover:
+            await self._commit(leftover)
+
+    async def _write(self, rows: List[DoctorPatientChat]) -> None:
+        async with SessionLocal() as db:
+            db.add_all(rows)
+            await db.flush()
+            # Keep the conversations summary in the same transaction
+            await crud_conversation.record_messages(db, messages=rows)
+            await db.commit()
+
+    async def _commit(self, batch: List[_Pending]) -> None:
+        try:
+            await self._write([row for row, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error(f"Chat message commit failed: {e}")
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            # One bad row must not fail its neighbours: retry each message on its own
+            logger.warning(f"Chat group commit of {len(batch)} message(s) failed ({e}); retrying one by one.")
+            for row, future in batch:
+                # The failed session rolled back; write a fresh copy of the row
+                await self._commit([(DoctorPatientChat(sender_id=row.sender_id, receiver_id=row.receiver_id, message=row.message), future)])
+            return
+        for row, future in batch:
+            if not future.done():
+                future.set_result(row)
+
+chat_writer = ChatWriteBehind(
+    batch_size=settings.CHAT_WRITE_BATCH_SIZE,
+    flush_interval=settings.CHAT_WRITE_FLUSH_MS / 1000.0,
+)
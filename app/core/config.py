@@ -53,6 +53,86 @@ class Settings(BaseSettings):
     LIVEKIT_API_KEY: str = ""
     LIVEKIT_API_SECRET: str = ""
     SIP_OUTBOUND_TRUNK_ID: str = ""
+
+    # Chat pub/sub between workers: "" = in-process (single worker), or redis://host:6379/0
+    CHAT_BACKPLANE_URL: str = ""
+    # Chat messages are group-committed: flush every N ms or N messages, whichever comes first
+    CHAT_WRITE_FLUSH_MS: int = 5
+    CHAT_WRITE_BATCH_SIZE: int = 100
+    # Per-socket outbound queue; when full: "drop_oldest" or "disconnect"
+    CHAT_SEND_QUEUE_SIZE: int = 256
+    CHAT_SLOW_CONSUMER_POLICY: str = "drop_oldest"
+    CHAT_SEND_TIMEOUT_S: float = 10.0
+    CHAT_HEARTBEAT_S: float = 25.0
+
+    # Voice dictation: MedASR requests in flight per socket
+    VOICE_MAX_IN_FLIGHT: int = 4
+    # Server-side VAD: buffer dictation audio and send utterance-sized segments
+    VOICE_VAD_ENABLED: bool = True
+    VOICE_MAX_SEGMENT_S: float = 15.0
+
+    # Content-addressed cache of MedASR transcripts / HeAR embeddings (SQLite, LRU-bounded)
+    INFERENCE_CACHE_PATH: str = "./inference_cache.db"
+    INFERENCE_CACHE_MAX_MB: int = 256
+    # Memory-mapped HeAR embedding store (vectors + id map)
+    EMBEDDING_STORE_DIR: str = "./embeddings"
+    # HeAR anomaly levels: Moderate / High above these percentiles of the stored population
+    HEAR_ANOMALY_PERCENTILES: tuple[float, float] = (90.0, 99.0)
+    HEAR_ANOMALY_MIN_SAMPLES: int = 50
+    # Refit the anomaly model once the store has grown by this fraction since the last fit
+    HEAR_ANOMALY_REFIT_GROWTH: float = 0.1
+    # Per-model TTL in seconds (models not listed never expire)
+    INFERENCE_CACHE_TTL_S: dict[str, int] = {
+        "vision": 7 * 86400,
+        "skin-india": 7 * 86400,
+        "siglip": 30 * 86400,
+        "siglip-embed": 30 * 86400,
+    }
+
+    # Shared outbound HTTP pool (HF Space + media downloads); HTTP/2 needs the h2 package
+    HTTP2_ENABLED: bool = True
+    HTTP_POOL_MAX_CONNECTIONS: int = 100
+    HTTP_POOL_MAX_KEEPALIVE: int = 20
+    HTTP_KEEPALIVE_EXPIRY_S: float = 30.0
+    # Media URLs (images, audio, PDFs) are fetched from the Supabase and HF Space hosts, these
+    # hosts (and their subdomains), or any other host that resolves only to public addresses
+    MEDIA_ALLOWED_HOSTS: list[str] = []
+    MEDIA_MAX_REDIRECTS: int = 3
+
+    # HF Space resilience: retries, per-endpoint circuit breaker, cold-start wait
+    HF_RETRY_ATTEMPTS: int = 3
+    HF_RETRY_BASE_S: float = 0.5
+    HF_RETRY_MAX_S: float = 8.0
+    HF_BREAKER_THRESHOLD: int = 5
+    HF_BREAKER_RESET_S: float = 30.0
+    HF_COLD_START_TIMEOUT_S: float = 180.0
+    HF_READINESS_PATH: str = "/"
+    HF_READINESS_INTERVAL_S: float = 2.0
+
+    # Admission control for Space calls: concurrent calls per endpoint, queue wait deadline per priority
+    ADMISSION_LIMITS: dict[str, int] = {
+        "/agent/vision": 2,
+        "/agent/skin-india": 2,
+        "/agent/speech": 4,
+        "/agent/siglip/text": 4,
+        "/agent/siglip/embed": 4,
+        "/agent/hear/embed": 4,
+    }
+    ADMISSION_DEFAULT_LIMIT: int = 4
+    ADMISSION_DEADLINE_S: dict[str, float] = {
+        "critical": 300,
+        "high": 180,
+        "normal": 120,
+        "batch": 60,
+    }
+
+    # Batch SigLIP classification: requests in flight at once, items scheduled per chunk
+    SIGLIP_BATCH_CONCURRENCY: int = 4
+    SIGLIP_BATCH_CHUNK_SIZE: int = 32
+    # Screen image documents with SigLIP (default label set) in the background after upload
+    SIGLIP_CLASSIFY_ON_UPLOAD: bool = True
+    # Softmax temperature for local scoring over SigLIP embeddings (cosine * scale)
+    SIGLIP_LOGIT_SCALE: float = 100.0
     
 
     model_config = SettingsConfigDict(case_sensitive=True, env_file=".env", extra="ignore")
@@ -0,0 +1,226 @@
+"""
+Persistent store for HeAR embeddings, one vector per (patient, recording).
+
+Layout (EMBEDDING_STORE_DIR):
+- `<name>.f32`   raw float32 rows, memory-mapped; capacity doubles as it fills
+- `<name>.jsonl` append-only id map, one line per row:
+                 {"row", "patient_id", "recording_id", "created_at"}
+
+A vector is written and flushed before its id line is appended, so a crash can only
+leave an unreferenced row behind. Re-adding an existing (patient, recording) overwrites
+its row in place and appends a newer id line for it; the last line per row wins on load.
+
+Search is a single matrix-vector product over the mapped rows (cosine, with row norms
+kept in memory), optionally restricted to a set of patients. File I/O runs in a worker thread.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Collection, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingStore:
+    _initial_capacity = 1024
+
+    def __init__(self, directory: str, name: str):
+        self.vectors_path = os.path.join(directory, f"{name}.f32")
+        self.ids_path = os.path.join(directory, f"{name}.jsonl")
+        self.directory = directory
+        self.dim: Optional[int] = None
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._matrix: Optional[np.memmap] = None
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._count = 0
+        self._rows: dict[tuple[str, str], int] = {}
+        self._by_patient: dict[str, list[int]] = {}
+        self._meta: list[dict] = []
+        self.searches = 0
+
+    # ── Sync core (runs in a worker thread) ──
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.ids_path):
+            with open(self.ids_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line after a crash
+                    self.dim = entry["dim"]
+                    row = entry["row"]
+                    if row == len(self._meta):
+                        self._meta.append(entry)
+                        self._by_patient.setdefault(entry["patient_id"], []).append(row)
+                    elif row < len(self._meta):
+                        self._meta[row] = entry
+                    else:
+                        continue
+                    self._rows[(entry["patient_id"], entry["recording_id"])] = row
+        self._count = len(self._meta)
+        if self.dim and os.path.exists(self.vectors_path):
+            capacity = os.path.getsize(self.vectors_path) // (4 * self.dim)
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+            self._norms = np.zeros(capacity, dtype=np.float32)
+            self._norms[: self._count] = np.linalg.norm(self._matrix[: self._count], axis=1)
+        self._loaded = True
+
+    def _ensure_capacity(self, rows: int) -> None:
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = max(self._initial_capacity, capacity * 2)
+        while new_capacity < rows:
+            new_capacity *= 2
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(new_capacity, self.dim))
+        self._norms = np.concatenate([self._norms, np.zeros(new_capacity - len(self._norms), dtype=np.float32)])
+
+    def _add(self, patient_id: str, recording_id: str, vector: np.ndarray) -> int:
+        with self._lock:
+            self._load()
+            if self.dim is None:
+                self.dim = len(vector)
+            if len(vector) != self.dim:
+                raise ValueError(f"Embedding has dimension {len(vector)}, store holds {self.dim}")
+
+            key = (patient_id, recording_id)
+            row = self._rows.get(key, self._count)
+            self._ensure_capacity(row + 1)
+            self._matrix[row] = vector
+            self._matrix.flush()
+
+            entry = {
+                "row": row, "patient_id": patient_id, "recording_id": recording_id,
+                "created_at": time.time(), "dim": self.dim,
+            }
+            with open(self.ids_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+            if row == self._count:
+                self._meta.append(entry)
+                self._by_patient.setdefault(patient_id, []).append(row)
+                self._count += 1
+            else:
+                self._meta[row] = entry
+            self._norms[row] = np.linalg.norm(vector)
+            self._rows[key] = row
+            return row
+
+    def _patient_rows(self, patient_id: str) -> np.ndarray:
+        rows = self._by_patient.get(patient_id, [])
+        return np.array(sorted(rows, key=lambda r: self._meta[r]["created_at"]), dtype=np.int64)
+
+    def _candidate_rows(self, patient_ids: Optional[Collection[str]]) -> np.ndarray:
+        if patient_ids is None:
+            return np.arange(self._count)
+        rows = [row for pid in patient_ids for row in self._by_patient.get(pid, [])]
+        return np.array(sorted(rows), dtype=np.int64)
+
+    def _public(self, row: int, **extra) -> dict:
+        meta = self._meta[row]
+        return {
+            "patient_id": meta["patient_id"],
+            "recording_id": meta["recording_id"],
+            "created_at": meta["created_at"],
+            **extra,
+        }
+
+    def _search(
+        self, vector: np.ndarray, k: int, patient_ids: Optional[Collection[str]], exclude: Optional[tuple]
+    ) -> list[dict]:
+        with self._lock:
+            self._load()
+            if not self._count or len(vector) != self.dim:
+                return []
+            rows = self._candidate_rows(patient_ids)
+            if exclude is not None and exclude in self._rows:
+                rows = rows[rows != self._rows[exclude]]
+            if not len(rows):
+                return []
+            scores = (self._matrix[rows] @ vector) / np.maximum(self._norms[rows] * np.linalg.norm(vector), 1e-12)
+            k = min(k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            self.searches += 1
+            return [self._public(int(rows[i]), score=round(float(scores[i]), 4)) for i in top]
+
+    def _history(self, patient_id: str) -> list[dict]:
+        """Recordings oldest first, each with cosine similarity to the previous one and to the first."""
+        with self._lock:
+            self._load()
+            rows = self._patient_rows(patient_id)
+            if not len(rows):
+                return []
+            unit = self._matrix[rows] / np.maximum(self._norms[rows], 1e-12)[:, None]
+            to_baseline = unit @ unit[0]
+            to_previous = np.einsum("ij,ij->i", unit[1:], unit[:-1])
+            return [
+                self._public(
+                    int(row),
+                    similarity_to_previous=round(float(to_previous[i - 1]), 4) if i else None,
+                    similarity_to_baseline=round(float(to_baseline[i]), 4),
+                )
+                for i, row in enumerate(rows)
+            ]
+
+    def _vectors(self, patient_id: Optional[str]) -> np.ndarray:
+        with self._lock:
+            self._load()
+            if not self._count:
+                return np.zeros((0, self.dim or 0), dtype=np.float32)
+            rows = self._patient_rows(patient_id) if patient_id else np.arange(self._count)
+            return np.array(self._matrix[rows])
+
+    # ── Async API ──
+
+    async def add(self, patient_id: str, recording_id: str, vector: Sequence[float]) -> int:
+        """Store (or replace) a recording's embedding. Returns its row."""
+        return await asyncio.to_thread(self._add, patient_id, recording_id, np.asarray(vector, dtype=np.float32))
+
+    async def search(
+        self,
+        vector: Sequence[float],
+        k: int = 5,
+        patient_ids: Optional[Collection[str]] = None,
+        exclude: Optional[tuple[str, str]] = None,
+    ) -> list[dict]:
+        """Top-k stored recordings by cosine similarity, restricted to `patient_ids` if given."""
+        return await asyncio.to_thread(self._search, np.asarray(vector, dtype=np.float32), k, patient_ids, exclude)
+
+    async def history(self, patient_id: str) -> list[dict]:
+        return await asyncio.to_thread(self._history, patient_id)
+
+    async def vectors(self, patient_id: Optional[str] = None) -> np.ndarray:
+        """Copy of the stored vectors, shape (n, dim)."""
+        return await asyncio.to_thread(self._vectors, patient_id)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            self._load()
+            return {
+                "recordings": self._count,
+                "patients": len({pid for pid, _ in self._rows}),
+                "dim": self.dim,
+                "capacity": 0 if self._matrix is None else self._matrix.shape[0],
+                "searches": self.searches,
+            }
+
+
+hear_store = EmbeddingStore(settings.EMBEDDING_STORE_DIR, "hear")
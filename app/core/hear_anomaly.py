@@ -0,0 +1,181 @@
+"""
+Calibrated anomaly scoring for HeAR embeddings.
+
+The population is the set of embeddings in the HeAR store (one vector per patient and
+recording, so re-stored recordings are not counted twice). A recording is scored by its
+squared Mahalanobis distance to the population mean, divided by the dimension:
+
+    score = (x - mean)ᵀ Σ⁻¹ (x - mean) / D
+
+Σ is the sample covariance shrunk towards its diagonal by D / (n + D), which keeps it
+invertible while there are fewer recordings than dimensions. Scoring is a batch matrix
+product with the whitening matrix (Σ^-1/2), computed once per fit.
+
+Levels come from percentiles of the population's own scores (HEAR_ANOMALY_PERCENTILES:
+above the first is Moderate, above the second is High). Mean, whitening and thresholds
+are fitted from the whole store and saved next to it. The fit is redone automatically
+once the store has grown by HEAR_ANOMALY_REFIT_GROWTH since the last one
+(`refresh()`, called when embeddings are stored), or on demand:
+
+    python -m app.core.hear_anomaly            # or POST /admin/hear-anomaly/recalibrate
+
+Below HEAR_ANOMALY_MIN_SAMPLES recordings the model is uncalibrated and reports no level.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.embedding_store import EmbeddingStore, hear_store
+
+logger = logging.getLogger(__name__)
+
+LEVELS = ("Low", "Moderate", "High")
+
+
+class HearAnomalyModel:
+    def __init__(self, path: str, store: EmbeddingStore):
+        self.path = path
+        self.store = store
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._refit: Optional[asyncio.Task] = None
+        self.fitted_count = 0
+        self.fitted_at: Optional[float] = None
+        self._center: Optional[np.ndarray] = None
+        self._whiten: Optional[np.ndarray] = None
+        self._reference: Optional[np.ndarray] = None  # Sorted population scores
+        self.thresholds: Optional[np.ndarray] = None
+
+    @property
+    def calibrated(self) -> bool:
+        return self.thresholds is not None
+
+    # ── Sync core (runs in a worker thread) ──
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                saved = {key: data[key] for key in data.files}
+            self.fitted_count = int(saved["fitted_count"])
+            self.fitted_at = float(saved["fitted_at"])
+            self._center, self._whiten = saved["center"], saved["whiten"]
+            self._reference, self.thresholds = saved["reference"], saved["thresholds"]
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"HeAR calibration at {self.path} unreadable, ignoring it: {e}")
+
+    def _save(self) -> None:
+        if self._whiten is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp.npz"
+        np.savez(
+            tmp, fitted_count=self.fitted_count, fitted_at=self.fitted_at,
+            center=self._center, whiten=self._whiten,
+            reference=self._reference, thresholds=self.thresholds,
+        )
+        os.replace(tmp, self.path)
+
+    def _fit(self, vectors: np.ndarray) -> dict:
+        """Rebuild mean, whitening and thresholds from the given population."""
+        with self._lock:
+            self._load()
+            n, dim = vectors.shape
+            if n < settings.HEAR_ANOMALY_MIN_SAMPLES:
+                return {"calibrated": False, "samples": n, "min_samples": settings.HEAR_ANOMALY_MIN_SAMPLES}
+
+            population = vectors.astype(np.float64)
+            mean = population.mean(axis=0)
+            centered = population - mean
+            cov = centered.T @ centered / max(n - 1, 1)
+            shrinkage = dim / (n + dim)
+            cov = (1 - shrinkage) * cov + shrinkage * np.diag(np.diag(cov))
+            eigvals, eigvecs = np.linalg.eigh(cov)
+            floor = max(float(eigvals.max()) * 1e-9, 1e-12)
+            self._center = mean
+            self._whiten = eigvecs / np.sqrt(np.maximum(eigvals, floor))
+
+            self._reference = np.sort(self._score(population))
+            self.thresholds = np.percentile(self._reference, settings.HEAR_ANOMALY_PERCENTILES)
+            self.fitted_count = n
+            self.fitted_at = time.time()
+            self._save()
+            return {"calibrated": True, **self._describe()}
+
+    def _score(self, vectors: np.ndarray) -> np.ndarray:
+        whitened = (vectors - self._center) @ self._whiten
+        return np.einsum("ij,ij->i", whitened, whitened) / whitened.shape[1]
+
+    def _assess(self, vectors: np.ndarray) -> list[dict]:
+        with self._lock:
+            self._load()
+            if not self.calibrated or vectors.shape[1] != len(self._center):
+                return [{"score": None, "percentile": None, "level": None} for _ in vectors]
+            scores = self._score(vectors.astype(np.float64))
+            levels = np.searchsorted(self.thresholds, scores, side="right")
+            percentiles = 100.0 * np.searchsorted(self._reference, scores, side="right") / len(self._reference)
+            return [
+                {"score": round(float(s), 3), "percentile": round(float(p), 1), "level": LEVELS[int(l)]}
+                for s, p, l in zip(scores, percentiles, levels)
+            ]
+
+    def _describe(self) -> dict:
+        return {
+            "samples": self.store.metrics()["recordings"],
+            "fitted_samples": self.fitted_count,
+            "fitted_at": self.fitted_at,
+            "dim": None if self._center is None else len(self._center),
+            "percentiles": list(settings.HEAR_ANOMALY_PERCENTILES),
+            "thresholds": None if self.thresholds is None else [round(float(t), 3) for t in self.thresholds],
+        }
+
+    # ── Async API ──
+
+    async def assess(self, vectors) -> list[dict]:
+        """Score a batch of embeddings: [{"score", "percentile", "level"}] (None values if uncalibrated)."""
+        return await asyncio.to_thread(self._assess, np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+
+    async def recalibrate(self) -> dict:
+        """Refit on every embedding currently in the store."""
+        return await asyncio.to_thread(self._fit, await self.store.vectors())
+
+    async def refresh(self) -> bool:
+        """Start a background refit if the store has grown enough since the last fit. Returns True if started."""
+        await asyncio.to_thread(self._load)
+        samples = (await asyncio.to_thread(self.store.metrics))["recordings"]
+        due = samples >= settings.HEAR_ANOMALY_MIN_SAMPLES and samples >= self.fitted_count * (1 + settings.HEAR_ANOMALY_REFIT_GROWTH)
+        if not due or (self._refit is not None and not self._refit.done()):
+            return False
+        self._refit = asyncio.create_task(self._background_refit(samples))
+        return True
+
+    async def _background_refit(self, samples: int) -> None:
+        try:
+            await self.recalibrate()
+            logger.info(f"HeAR anomaly model refitted on {samples} recordings.")
+        except Exception as e:
+            logger.error(f"HeAR anomaly refit failed: {e}")
+
+    def metrics(self) -> dict:
+        with self._lock:
+            self._load()
+            return {"calibrated": self.calibrated, **self._describe()}
+
+
+hear_anomaly = HearAnomalyModel(os.path.join(settings.EMBEDDING_STORE_DIR, "hear_calibration.npz"), hear_store)
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(asyncio.run(hear_anomaly.recalibrate()), indent=2))
@@ -0,0 +1,170 @@
+"""
+Shared outbound HTTP client.
+
+One pooled `httpx.AsyncClient` serves every call to the HF Space and every media
+download, so keep-alive connections (and their TLS sessions) are reused instead of being
+set up per request. HTTP/2 is used when the `h2` package is installed. It is opened in
+`main.lifespan` and closed on shutdown; code running outside the app (scripts,
+benchmarks) gets a lazily created client.
+
+Timeouts are per endpoint (`timeout("vision")` etc.). Per-host request and new-connection
+counters come from httpcore's trace hook; requests minus connections is the reuse count.
+
+Media URLs come from users, so `fetch_bytes` / `fetch_validator` check every URL (and every
+redirect hop) first: http(s) only, and the host must be allow-listed (Supabase, the Space,
+MEDIA_ALLOWED_HOSTS) or resolve only to public addresses. Anything else raises UnsafeURL.
+"""
+import asyncio
+import ipaddress
+import logging
+import socket
+from collections import defaultdict
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Total seconds per call; connect is capped separately so a dead host fails fast
+ENDPOINT_TIMEOUTS = {
+    "vision": 120.0,
+    "speech": 60.0,
+    "siglip": 30.0,
+    "hear": 60.0,
+    "media": 30.0,
+    "wake": 5.0,
+}
+CONNECT_TIMEOUT = 10.0
+
+
+class UnsafeURL(ValueError):
+    pass
+
+
+def _allowed_hosts() -> set[str]:
+    hosts = {host.lower() for host in settings.MEDIA_ALLOWED_HOSTS}
+    for url in (settings.SUPABASE_URL, settings.HUGGINGFACE_SPACE):
+        if url:
+            hosts.add((urlsplit(url).hostname or "").lower())
+    hosts.discard("")
+    return hosts
+
+
+async def _resolves_public(host: str) -> bool:
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError):
+        return False
+    addresses = {ipaddress.ip_address(info[4][0].split("%", 1)[0]) for info in infos}
+    return bool(addresses) and all(address.is_global for address in addresses)
+
+
+async def check_media_url(url: str) -> None:
+    """Raise UnsafeURL unless `url` may be fetched on a user's behalf."""
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host:
+        raise UnsafeURL(f"Unsupported media URL: {url!r}")
+    if any(host == allowed or host.endswith(f".{allowed}") for allowed in _allowed_hosts()):
+        return
+    if not await _resolves_public(host):
+        raise UnsafeURL(f"Media host not allowed: {host}")
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HTTPClientPool:
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests: dict[str, int] = defaultdict(int)
+        self.connections: dict[str, int] = defaultdict(int)
+        self.http2 = settings.HTTP2_ENABLED and _http2_available()
+
+    def _create(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_S,
+            ),
+            timeout=self.timeout("media"),
+            follow_redirects=True,
+            event_hooks={"request": [self._on_request]},
+        )
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = self._create()
+            logger.info(f"HTTP client pool started (http2={self.http2}).")
+
+    async def stop(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = self._create()
+        return self._client
+
+    @staticmethod
+    def timeout(endpoint: str) -> httpx.Timeout:
+        return httpx.Timeout(ENDPOINT_TIMEOUTS.get(endpoint, ENDPOINT_TIMEOUTS["media"]), connect=CONNECT_TIMEOUT)
+
+    async def _media_request(self, method: str, url: str, endpoint: str) -> httpx.Response:
+        """Send a media request, following redirects only to URLs that pass check_media_url."""
+        for _ in range(settings.MEDIA_MAX_REDIRECTS + 1):
+            await check_media_url(url)
+            resp = await self.client.request(method, url, timeout=self.timeout(endpoint), follow_redirects=False)
+            if not resp.is_redirect:
+                resp.raise_for_status()
+                return resp
+            url = str(resp.url.join(resp.headers["location"]))
+        raise httpx.TooManyRedirects(f"More than {settings.MEDIA_MAX_REDIRECTS} redirects", request=resp.request)
+
+    async def fetch_bytes(self, url: str, endpoint: str = "media") -> bytes:
+        """GET a media URL (image, audio, PDF) and return the body; raises on HTTP errors and UnsafeURL."""
+        return (await self._media_request("GET", url, endpoint)).content
+
+    async def fetch_validator(self, url: str) -> Optional[str]:
+        """ETag (or Last-Modified) of a media URL from a HEAD request; None if the server sends neither."""
+        resp = await self._media_request("HEAD", url, "media")
+        return resp.headers.get("etag") or resp.headers.get("last-modified")
+
+    # ── Metrics ──
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        host = request.url.host
+        self.requests[host] += 1
+
+        async def trace(event_name: str, info: dict):
+            if event_name == "connection.connect_tcp.complete":
+                self.connections[host] += 1
+
+        request.extensions["trace"] = trace
+
+    def metrics(self) -> dict:
+        hosts = {}
+        for host, count in self.requests.items():
+            opened = self.connections.get(host, 0)
+            hosts[host] = {
+                "requests": count,
+                "connections_opened": opened,
+                "reused": max(0, count - opened),
+                "reuse_rate": round(max(0, count - opened) / count, 4) if count else None,
+            }
+        return {"http2": self.http2, "open": self._client is not None, "hosts": hosts}
+
+
+http_pool = HTTPClientPool()
@@ -0,0 +1,180 @@
+"""
+Content-addressed cache for remote model inference results.
+
+Results are keyed by SHA-256 of the model name plus the exact inputs (normalized audio
+bytes; image version, i.e. URL + ETag or a content hash, plus prompt / candidate set) and stored in a small SQLite file next
+to the app database. The store is bounded by total value size; the least recently used
+entries are evicted first. Entries older than the model's TTL (INFERENCE_CACHE_TTL_S,
+none = keep until evicted) count as misses and are dropped. Hit/miss counters are kept
+per model for the admin endpoints.
+
+SQLite calls are short and run in a worker thread so they never block the event loop
+(metrics included).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Optional, Union
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(model: str, *parts: Union[bytes, str]) -> str:
+    h = hashlib.sha256(model.encode())
+    for part in parts:
+        data = part.encode() if isinstance(part, str) else part
+        # Length prefix keeps ("ab", "c") and ("a", "bc") distinct
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()
+
+
+class InferenceCache:
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self.hits: dict[str, int] = defaultdict(int)
+        self.misses: dict[str, int] = defaultdict(int)
+        self.evictions = 0
+        self.expired = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS inference_cache ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, value BLOB NOT NULL,"
+                " size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_inference_cache_accessed_at ON inference_cache (accessed_at)")
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM inference_cache").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    # ── Sync core (runs in a worker thread) ──
+
+    def _get(self, model: str, key: str) -> Optional[Any]:
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT value, size, created_at FROM inference_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses[model] += 1
+                return None
+            now = time.time()
+            ttl = settings.INFERENCE_CACHE_TTL_S.get(model)
+            if ttl and now - row[2] > ttl:
+                db.execute("DELETE FROM inference_cache WHERE key = ?", (key,))
+                db.commit()
+                self._total_bytes -= row[1]
+                self.expired += 1
+                self.misses[model] += 1
+                return None
+            db.execute("UPDATE inference_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            db.commit()
+            self.hits[model] += 1
+            return json.loads(row[0])
+
+    def _set(self, model: str, key: str, value: Any) -> None:
+        blob = json.dumps(value, separators=(",", ":")).encode()
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            old = db.execute("SELECT size FROM inference_cache WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO inference_cache (key, model, value, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, blob, len(blob), now, now),
+            )
+            self._total_bytes += len(blob) - (old[0] if old else 0)
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """Drop least recently used entries until the store fits in max_bytes."""
+        while self._total_bytes > self.max_bytes:
+            rows = db.execute(
+                "SELECT key, size FROM inference_cache ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for key, size in rows:
+                db.execute("DELETE FROM inference_cache WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+                if self._total_bytes <= self.max_bytes:
+                    return
+
+    def _purge(self, model: Optional[str]) -> int:
+        with self._lock:
+            db = self._db()
+            if model:
+                deleted = db.execute("DELETE FROM inference_cache WHERE model = ?", (model,)).rowcount
+            else:
+                deleted = db.execute("DELETE FROM inference_cache").rowcount
+            db.commit()
+            self._total_bytes = db.execute("SELECT COALESCE(SUM(size), 0) FROM inference_cache").fetchone()[0]
+            return deleted
+
+    def _metrics(self) -> dict:
+        models = {}
+        for model in sorted(set(self.hits) | set(self.misses)):
+            hits, misses = self.hits[model], self.misses[model]
+            models[model] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            }
+        with self._lock:
+            counts = dict(self._db().execute("SELECT model, COUNT(*) FROM inference_cache GROUP BY model").fetchall())
+        for model, count in counts.items():
+            models.setdefault(model, {"hits": 0, "misses": 0, "hit_rate": None})["entries"] = count
+        entries = sum(counts.values())
+        return {
+            "entries": entries,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "models": models,
+        }
+
+    # ── Async API ──
+
+    async def get(self, model: str, key: str) -> Optional[Any]:
+        try:
+            return await asyncio.to_thread(self._get, model, key)
+        except sqlite3.Error as e:
+            logger.warning(f"Inference cache read failed: {e}")
+            return None
+
+    async def set(self, model: str, key: str, value: Any) -> None:
+        try:
+            await asyncio.to_thread(self._set, model, key, value)
+        except sqlite3.Error as e:
+            logger.warning(f"Inference cache write failed: {e}")
+
+    async def purge(self, model: Optional[str] = None) -> int:
+        """Delete all entries (or one model's). Returns the number removed."""
+        return await asyncio.to_thread(self._purge, model)
+
+    async def metrics(self) -> dict:
+        """Entry counts and bytes, plus per-model hit/miss counters."""
+        return await asyncio.to_thread(self._metrics)
+
+
+inference_cache = InferenceCache(settings.INFERENCE_CACHE_PATH, settings.INFERENCE_CACHE_MAX_MB * 1024 * 1024)
@@ -0,0 +1,217 @@
+"""
+Resilience for calls to the HF Space.
+
+`space.call(endpoint, send)` wraps one outbound request:
+- retries 5xx responses and connect-level errors with full-jitter exponential backoff
+- keeps a circuit breaker per endpoint: after HF_BREAKER_THRESHOLD consecutive failures
+  calls fail fast for HF_BREAKER_RESET_S, then a single probe decides whether to close it
+- treats 502/503 and refused connections as a possible cold start: the first such
+  failure sends the wake-up ping and waits (shared by all callers) for the readiness
+  probe, so requests queue behind the wake-up instead of failing. Waiting does not
+  use up a retry or count against the breaker.
+
+`send` must return an `httpx.Response`; for streaming use `client.send(req, stream=True)`.
+Responses that are retried are closed here; the caller closes the one returned.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.http import http_pool
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {500, 502, 503, 504}
+COLD_START_STATUS = {502, 503}
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError, httpx.ReadError)
+COLD_START_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class SpaceUnavailable(Exception):
+    pass
+
+
+class CircuitOpenError(SpaceUnavailable):
+    pass
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = self.CLOSED
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._state = self.CLOSED
+        self._probe_in_flight = False
+
+    def release(self) -> None:
+        """The call was cancelled before it could succeed or fail."""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self._state == self.HALF_OPEN or self.failures >= self.threshold:
+            if self._state != self.OPEN:
+                logger.warning(f"Circuit opened after {self.failures} failure(s).")
+            self._state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class ColdStartGate:
+    """One shared wake-up + readiness wait for all callers hitting a sleeping Space."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.cold_starts = 0
+        self.last_wake_s: Optional[float] = None
+        self.ready_at = 0.0
+
+    @property
+    def waking(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def wait_ready(self) -> bool:
+        """True once the Space answers the readiness probe; False if it never did, or if
+        it was confirmed ready moments ago (then the failure is not a cold start)."""
+        if not self.waking and time.monotonic() - self.ready_at < settings.HF_COLD_START_TIMEOUT_S / 6:
+            return False
+        if not self.waking:
+            self.cold_starts += 1
+            self._task = asyncio.create_task(self._wake_and_probe())
+        return await asyncio.shield(self._task)
+
+    async def _wake_and_probe(self) -> bool:
+        from app.utils.wake_up import wake_up_huggingface
+
+        started = time.monotonic()
+        logger.info("HF Space looks cold; waking it up.")
+        await wake_up_huggingface()
+        deadline = started + settings.HF_COLD_START_TIMEOUT_S
+        url = f"{settings.HUGGINGFACE_SPACE}{settings.HF_READINESS_PATH}"
+        while time.monotonic() < deadline:
+            try:
+                resp = await http_pool.client.get(url, timeout=http_pool.timeout("wake"))
+                if resp.status_code < 500:
+                    self.ready_at = time.monotonic()
+                    self.last_wake_s = round(time.monotonic() - started, 2)
+                    logger.info(f"HF Space ready after {self.last_wake_s}s.")
+                    return True
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(settings.HF_READINESS_INTERVAL_S)
+        logger.warning("HF Space did not become ready in time.")
+        return False
+
+
+class SpaceResilience:
+    def __init__(self):
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.gate = ColdStartGate()
+        self.calls: dict[str, int] = defaultdict(int)
+        self.retries: dict[str, int] = defaultdict(int)
+        self.failures: dict[str, int] = defaultdict(int)
+        self.short_circuits: dict[str, int] = defaultdict(int)
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        if endpoint not in self.breakers:
+            self.breakers[endpoint] = CircuitBreaker(settings.HF_BREAKER_THRESHOLD, settings.HF_BREAKER_RESET_S)
+        return self.breakers[endpoint]
+
+    async def call(self, endpoint: str, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        breaker = self.breaker(endpoint)
+        self.calls[endpoint] += 1
+        if not breaker.allow():
+            self.short_circuits[endpoint] += 1
+            raise CircuitOpenError(f"{endpoint}: circuit open")
+
+        try:
+            return await self._attempt(endpoint, breaker, send)
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+
+    async def _attempt(self, endpoint: str, breaker: CircuitBreaker, send) -> httpx.Response:
+        attempt = 0
+        waited_for_wake = False
+        while True:
+            try:
+                resp = await send()
+            except RETRYABLE_ERRORS as e:
+                error, cold = repr(e), isinstance(e, COLD_START_ERRORS)
+            except Exception:
+                # Read timeouts etc.: the Space is up but struggling; not retried here
+                breaker.record_failure()
+                self.failures[endpoint] += 1
+                raise
+            else:
+                if resp.status_code not in RETRYABLE_STATUS:
+                    breaker.record_success()
+                    return resp
+                error, cold = f"HTTP {resp.status_code}", resp.status_code in COLD_START_STATUS
+                await resp.aclose()
+
+            if cold and not waited_for_wake:
+                waited_for_wake = True
+                if await self.gate.wait_ready():
+                    continue
+
+            attempt += 1
+            if attempt >= settings.HF_RETRY_ATTEMPTS:
+                breaker.record_failure()
+                self.failures[endpoint] += 1
+                raise SpaceUnavailable(f"{endpoint}: {error}")
+            self.retries[endpoint] += 1
+            backoff = min(settings.HF_RETRY_MAX_S, settings.HF_RETRY_BASE_S * 2 ** attempt)
+            await asyncio.sleep(random.uniform(0, backoff))
+
+    def metrics(self) -> dict:
+        return {
+            "waking": self.gate.waking,
+            "cold_starts": self.gate.cold_starts,
+            "last_wake_s": self.gate.last_wake_s,
+            "endpoints": {
+                name: {
+                    "state": breaker.state,
+                    "consecutive_failures": breaker.failures,
+                    "calls": self.calls[name],
+                    "retries": self.retries[name],
+                    "failures": self.failures[name],
+                    "short_circuits": self.short_circuits[name],
+                }
+                for name, breaker in self.breakers.items()
+            },
+        }
+
+
+space = SpaceResilience()
@@ -0,0 +1,65 @@
+"""
+Additive schema upgrades applied at startup (and by init_db.py).
+
+`Base.metadata.create_all` creates missing tables but never alters existing ones, so
+columns added to existing models are listed here. A column is added only if it is
+missing; its backfill and index statements are idempotent and run on every start, so
+rows left NULL by an interrupted upgrade are still filled in.
+"""
+import logging
+from typing import List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+# (table, column, DDL type, idempotent backfill / index statements)
+COLUMN_UPGRADES = [
+    (
+        "doctor_patient_chats", "pair_key", "VARCHAR",
+        [
+            # Canonical pair key for cursor-paged chat history
+            "UPDATE doctor_patient_chats SET pair_key = CASE WHEN sender_id < receiver_id "
+            "THEN sender_id || ':' || receiver_id ELSE receiver_id || ':' || sender_id END "
+            "WHERE pair_key IS NULL",
+            "CREATE INDEX IF NOT EXISTS ix_doctor_patient_chats_pair_key_id ON doctor_patient_chats (pair_key, id)",
+        ],
+    ),
+    # Stored MedSigLIP results per label set
+    ("documents", "classifications", "JSON", []),
+    (
+        "event_entries", "idempotency_key", "VARCHAR",
+        [
+            # Idempotency keys for bulk (offline sync) event appends, unique per event
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_event_entries_event_id_idempotency_key "
+            "ON event_entries (event_id, idempotency_key)",
+        ],
+    ),
+]
+
+
+def _existing_columns(sync_conn) -> dict:
+    inspector = inspect(sync_conn)
+    tables = set(inspector.get_table_names())
+    return {
+        table: {column["name"] for column in inspector.get_columns(table)}
+        for table, _, _, _ in COLUMN_UPGRADES
+        if table in tables
+    }
+
+
+async def upgrade_schema(conn: AsyncConnection) -> List[str]:
+    """Add missing columns (with their backfills). Returns "table.column" for each one added."""
+    existing = await conn.run_sync(_existing_columns)
+    added = []
+    for table, column, ddl_type, followups in COLUMN_UPGRADES:
+        if table not in existing:
+            continue
+        if column not in existing[table]:
+            await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+            added.append(f"{table}.{column}")
+            logger.info(f"Added column '{column}' to '{table}' table.")
+        for statement in followups:
+            await conn.execute(text(statement))
+    return added
@@ -0,0 +1,112 @@
+"""
+Single-flight coalescing of identical in-flight inference calls.
+
+While a call for a key is running, identical callers attach to it instead of sending
+another GPU request:
+- `do(key, fn)` shares the awaited result
+- `stream(key, factory)` shares a token stream: one task pumps the upstream generator
+  into a buffer and every subscriber replays it from the start, then follows live.
+  The upstream is cancelled once its last subscriber goes away.
+
+Keys are forgotten as soon as the call finishes; this is not a result cache.
+"""
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+def flight_key(*parts: Any) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        data = str(part).encode()
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()
+
+
+class _Broadcast:
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        # Waiters hold the old event; swapping makes each wake-up one-shot
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def pump(self, upstream: AsyncIterator[Any]):
+        try:
+            async for chunk in upstream:
+                self.chunks.append(chunk)
+                self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    async def follow(self) -> AsyncIterator[Any]:
+        i = 0
+        while True:
+            while i < len(self.chunks):
+                yield self.chunks[i]
+                i += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded: one caller being cancelled must not cancel the shared call
+        return await asyncio.shield(task)
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            self.leaders += 1
+            broadcast = _Broadcast()
+            broadcast.task = asyncio.create_task(broadcast.pump(factory()))
+            self._streams[key] = broadcast
+            broadcast.task.add_done_callback(lambda _: self._streams.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        broadcast.subscribers += 1
+        try:
+            async for chunk in broadcast.follow():
+                yield chunk
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.done:
+                broadcast.task.cancel()
+
+    def metrics(self) -> dict:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls) + len(self._streams),
+        }
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,147 @@
+from typing import Any, Dict, List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, case, func, and_, or_
+from sqlalchemy.orm import aliased
+from app.crud.base import CRUDBase, dialect_insert
+from app.models.conversation import Conversation, canonical_pair
+from app.models.doctor_patient_chat import DoctorPatientChat
+from app.models.user import User, UserRole
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.appointment import Appointment
+from app.models.hospital import Hospital
+from app.schemas.doctor_patient_chat import ConversationResponse
+
+class CRUDConversation(CRUDBase[Conversation, ConversationResponse, ConversationResponse]):
+    async def _upsert(self, db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        stmt = dialect_insert(db)(Conversation).values(rows)
+        excluded = stmt.excluded
+        newer = func.coalesce(Conversation.last_message_id, 0) < excluded.last_message_id
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_a_id", "user_b_id"],
+            set_={
+                "last_message_id": case((newer, excluded.last_message_id), else_=Conversation.last_message_id),
+                "last_message_at": case((newer, excluded.last_message_at), else_=Conversation.last_message_at),
+                "unread_a": Conversation.unread_a + excluded.unread_a,
+                "unread_b": Conversation.unread_b + excluded.unread_b,
+            },
+        )
+        await db.execute(stmt)
+
+    async def record_messages(self, db: AsyncSession, *, messages: List[DoctorPatientChat]) -> None:
+        """
+        Fold freshly flushed messages into their conversations (one upsert per batch).
+        Runs inside the caller's transaction.
+        """
+        pairs: Dict[tuple, Dict[str, Any]] = {}
+        for msg in messages:
+            user_a, user_b = canonical_pair(msg.sender_id, msg.receiver_id)
+            row = pairs.setdefault((user_a, user_b), {
+                "user_a_id": user_a, "user_b_id": user_b,
+                "last_message_id": 0, "last_message_at": None,
+                "unread_a": 0, "unread_b": 0,
+            })
+            if msg.id > row["last_message_id"]:
+                row["last_message_id"] = msg.id
+                row["last_message_at"] = msg.created_at
+            if not msg.is_read:
+                row["unread_a" if msg.receiver_id == user_a else "unread_b"] += 1
+        await self._upsert(db, list(pairs.values()))
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        """Recompute every conversation from doctor_patient_chats (initial backfill)."""
+        user_a = case((DoctorPatientChat.sender_id < DoctorPatientChat.receiver_id, DoctorPatientChat.sender_id), else_=DoctorPatientChat.receiver_id)
+        user_b = case((DoctorPatientChat.sender_id < DoctorPatientChat.receiver_id, DoctorPatientChat.receiver_id), else_=DoctorPatientChat.sender_id)
+        unread = DoctorPatientChat.is_read.isnot(True)
+        grouped = (
+            select(
+                user_a.label("user_a_id"),
+                user_b.label("user_b_id"),
+                func.max(DoctorPatientChat.id).label("last_message_id"),
+                func.sum(case((and_(unread, DoctorPatientChat.receiver_id == user_a), 1), else_=0)).label("unread_a"),
+                func.sum(case((and_(unread, DoctorPatientChat.receiver_id == user_b), 1), else_=0)).label("unread_b"),
+            )
+            .group_by(user_a, user_b)
+            .subquery()
+        )
+        last = aliased(DoctorPatientChat)
+        query = select(grouped, last.created_at).join(last, last.id == grouped.c.last_message_id)
+        rows = [
+            {
+                "user_a_id": r.user_a_id, "user_b_id": r.user_b_id,
+                "last_message_id": r.last_message_id, "last_message_at": r.created_at,
+                "unread_a": r.unread_a or 0, "unread_b": r.unread_b or 0,
+            }
+            for r in (await db.execute(query)).all()
+        ]
+        await db.execute(Conversation.__table__.delete())
+        for i in range(0, len(rows), 500):
+            await self._upsert(db, rows[i:i + 500])
+
+    async def ensure_built(self, db: AsyncSession) -> bool:
+        """Backfill once if conversations is empty but messages exist. Returns True if it rebuilt."""
+        has_conversations = (await db.execute(select(Conversation.id).limit(1))).first()
+        has_messages = (await db.execute(select(DoctorPatientChat.id).limit(1))).first()
+        if has_conversations or not has_messages:
+            return False
+        await self.rebuild(db)
+        await db.commit()
+        return True
+
+    async def get_contacts(self, db: AsyncSession, *, user: User) -> List[Dict[str, Any]]:
+        """
+        Contacts the user may chat with (patients: doctors they booked; doctors: patients who
+        booked them) with hospital, specialization, last message and unread count,
+        most recent conversation first. One query.
+        """
+        if user.role == UserRole.PATIENT:
+            contact_ids = (
+                select(Doctor.user_id)
+                .join(Appointment, Appointment.doctor_id == Doctor.id)
+                .join(Patient, Patient.id == Appointment.patient_id)
+                .where(Patient.user_id == user.id)
+            )
+        elif user.role == UserRole.DOCTOR:
+            contact_ids = (
+                select(Patient.user_id)
+                .join(Appointment, Appointment.patient_id == Patient.id)
+                .join(Doctor, Doctor.id == Appointment.doctor_id)
+                .where(Doctor.user_id == user.id, Patient.user_id.isnot(None))
+            )
+        else:
+            # For now, admins might see everyone or no one. Keep it empty for admin for simple MVP
+            return []
+
+        me = user.id
+        pair_a = case((User.id < me, User.id), else_=me)
+        pair_b = case((User.id < me, me), else_=User.id)
+        query = (
+            select(User, Doctor.specialization, Hospital.name, Conversation, DoctorPatientChat)
+            .where(User.id.in_(contact_ids))
+            .outerjoin(Doctor, and_(Doctor.user_id == User.id, User.role == UserRole.DOCTOR.value))
+            .outerjoin(Hospital, Hospital.id == Doctor.hospital_id)
+            .outerjoin(Conversation, and_(Conversation.user_a_id == pair_a, Conversation.user_b_id == pair_b))
+            .outerjoin(DoctorPatientChat, DoctorPatientChat.id == Conversation.last_message_id)
+            .order_by(Conversation.last_message_at.desc().nulls_last(), User.full_name)
+        )
+
+        contacts = []
+        for u, specialization, hospital_name, conv, last_msg in (await db.execute(query)).all():
+            unread = 0
+            if conv:
+                unread = conv.unread_a if conv.user_a_id == me else conv.unread_b
+            contacts.append({
+                "id": u.id,
+                "full_name": u.full_name or "Unknown User",
+                "role": u.role,
+                "image": u.image,
+                "hospital_name": hospital_name,
+                "specialization": specialization,
+                "last_message": last_msg,
+                "unread_count": unread,
+            })
+        return contacts
+
+conversation = CRUDConversation(Conversation)
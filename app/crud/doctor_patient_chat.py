@@ -1,27 +1,39 @@
-from typing import List
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, and_
+from sqlalchemy import select, update, case, and_
 from app.crud.base import CRUDBase
-from app.models.doctor_patient_chat import DoctorPatientChat
+from app.models.doctor_patient_chat import DoctorPatientChat, make_pair_key
+from app.models.conversation import Conversation, canonical_pair
 from app.schemas.doctor_patient_chat import ChatMessageCreate
 
 class CRUDDoctorPatientChat(CRUDBase[DoctorPatientChat, ChatMessageCreate, ChatMessageCreate]):
     async def get_chat_history(
-        self, db: AsyncSession, *, user1_id: str, user2_id: str, skip: int = 0, limit: int = 100
+        self,
+        db: AsyncSession,
+        *,
+        user1_id: str,
+        user2_id: str,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 100,
     ) -> List[DoctorPatientChat]:
-        query = (
-            select(DoctorPatientChat)
-            .where(
-                or_(
-                    and_(DoctorPatientChat.sender_id == user1_id, DoctorPatientChat.receiver_id == user2_id),
-                    and_(DoctorPatientChat.sender_id == user2_id, DoctorPatientChat.receiver_id == user1_id),
-                )
-            )
-            .order_by(DoctorPatientChat.created_at.asc())
-            .offset(skip)
-            .limit(limit)
-        )
-        result = await db.execute(query)
+        """
+        Messages between two users, oldest first, served by the (pair_key, id) index.
+        - before_id: the `limit` messages just before this id (scrolling back)
+        - after_id:  the `limit` messages just after this id (catching up)
+        - neither:   legacy OFFSET paging from the start of the conversation
+        """
+        query = select(DoctorPatientChat).where(DoctorPatientChat.pair_key == make_pair_key(user1_id, user2_id))
+        if before_id is not None:
+            query = query.where(DoctorPatientChat.id < before_id).order_by(DoctorPatientChat.id.desc()).limit(limit)
+            result = await db.execute(query)
+            return list(reversed(result.scalars().all()))
+        if after_id is not None:
+            query = query.where(DoctorPatientChat.id > after_id)
+        else:
+            query = query.offset(skip)
+        result = await db.execute(query.order_by(DoctorPatientChat.id.asc()).limit(limit))
         return result.scalars().all()
 
     async def get_last_message(
@@ -29,16 +41,41 @@ class CRUDDoctorPatientChat(CRUDBase[DoctorPatientChat, ChatMessageCreate, ChatM
     ) -> DoctorPatientChat | None:
         query = (
             select(DoctorPatientChat)
-            .where(
-                or_(
-                    and_(DoctorPatientChat.sender_id == user1_id, DoctorPatientChat.receiver_id == user2_id),
-                    and_(DoctorPatientChat.sender_id == user2_id, DoctorPatientChat.receiver_id == user1_id),
-                )
-            )
-            .order_by(DoctorPatientChat.created_at.desc())
+            .where(DoctorPatientChat.pair_key == make_pair_key(user1_id, user2_id))
+            .order_by(DoctorPatientChat.id.desc())
             .limit(1)
         )
         result = await db.execute(query)
         return result.scalars().first()
 
+    async def mark_read(
+        self, db: AsyncSession, *, reader_id: str, contact_id: str, up_to_id: int
+    ) -> int:
+        """
+        Mark every message from contact to reader with id <= up_to_id as read, and subtract
+        the count from the reader's side of the conversation counter. Returns the count.
+        """
+        result = await db.execute(
+            update(DoctorPatientChat)
+            .where(
+                DoctorPatientChat.pair_key == make_pair_key(reader_id, contact_id),
+                DoctorPatientChat.receiver_id == reader_id,
+                DoctorPatientChat.id <= up_to_id,
+                DoctorPatientChat.is_read.isnot(True),
+            )
+            .values(is_read=True)
+            .execution_options(synchronize_session=False)
+        )
+        marked = result.rowcount or 0
+        if marked:
+            user_a, user_b = canonical_pair(reader_id, contact_id)
+            column = Conversation.unread_a if reader_id == user_a else Conversation.unread_b
+            await db.execute(
+                update(Conversation)
+                .where(and_(Conversation.user_a_id == user_a, Conversation.user_b_id == user_b))
+                .values({column: case((column > marked, column - marked), else_=0)})
+            )
+        await db.commit()
+        return marked
+
 chat = CRUDDoctorPatientChat(DoctorPatientChat)
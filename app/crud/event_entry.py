@@ -0,0 +1,128 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, null
+from app.crud.base import CRUDBase
+from app.models.event import Event
+from app.models.event_entry import EventEntry
+from app.schemas.event import EventEntryCreate
+from app.utils.timeseries import naive_utc
+
+def _parse_appended_at(data: Dict[str, Any]) -> datetime:
+    value = data.get("_appended_at")
+    if isinstance(value, str):
+        try:
+            return naive_utc(datetime.fromisoformat(value))
+        except ValueError:
+            pass
+    return naive_utc(datetime.now(timezone.utc))
+
+class CRUDEventEntry(CRUDBase[EventEntry, EventEntryCreate, EventEntryCreate]):
+    def build(
+        self, *, event_id: str, data: Dict[str, Any], appended_by_id: Optional[str] = None, idempotency_key: Optional[str] = None
+    ) -> EventEntry:
+        """
+        Build (but do not add) an entry row, denormalizing place_name and the timestamp.
+        """
+        place = data.get("place_name")
+        return EventEntry(
+            event_id=event_id,
+            data=data,
+            place_name=str(place) if place else None,
+            appended_at=_parse_appended_at(data),
+            appended_by_id=appended_by_id or data.get("_appended_by"),
+            idempotency_key=idempotency_key,
+        )
+
+    async def append(
+        self, db: AsyncSession, *, event_id: str, data: Dict[str, Any], appended_by_id: Optional[str] = None
+    ) -> EventEntry:
+        """
+        Single-row insert. The caller owns the transaction (commit).
+        """
+        entry = self.build(event_id=event_id, data=data, appended_by_id=appended_by_id)
+        db.add(entry)
+        await db.flush()
+        return entry
+
+    async def get_ids_by_idempotency_key(
+        self, db: AsyncSession, *, event_id: str, keys: Iterable[str]
+    ) -> Dict[str, int]:
+        keys = list(keys)
+        found: Dict[str, int] = {}
+        for i in range(0, len(keys), 500): # Stay well under bind-parameter limits
+            result = await db.execute(
+                select(EventEntry.idempotency_key, EventEntry.id).where(
+                    EventEntry.event_id == event_id, EventEntry.idempotency_key.in_(keys[i:i + 500])
+                )
+            )
+            found.update(dict(result.all()))
+        return found
+
+    async def append_many(
+        self,
+        db: AsyncSession,
+        *,
+        event_id: str,
+        items: List[Tuple[str, Dict[str, Any]]],
+        appended_by_id: Optional[str] = None,
+    ) -> Tuple[List[Tuple[str, str, int]], List[EventEntry]]:
+        """
+        Insert (idempotency_key, data) items, skipping keys already stored for the event
+        or repeated within the batch. The caller owns the transaction (commit once per batch).
+        Returns ([(key, "created" | "duplicate", entry_id)], created_entries).
+        """
+        existing = await self.get_ids_by_idempotency_key(db, event_id=event_id, keys={key for key, _ in items})
+        created: Dict[str, EventEntry] = {}
+        statuses: List[Tuple[str, str]] = []
+        for key, data in items:
+            if key in existing or key in created:
+                statuses.append((key, "duplicate"))
+                continue
+            created[key] = self.build(
+                event_id=event_id, data=data, appended_by_id=appended_by_id, idempotency_key=key
+            )
+            statuses.append((key, "created"))
+
+        db.add_all(created.values())
+        await db.flush()
+
+        results = []
+        for key, status in statuses:
+            entry_id = existing[key] if key in existing else created[key].id
+            results.append((key, status, entry_id))
+        return results, list(created.values())
+
+    async def replace_for_event(
+        self, db: AsyncSession, *, event_id: str, records: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Replace every entry of an event (backs PUT /events/{id} with json_data).
+        """
+        await db.execute(delete(EventEntry).where(EventEntry.event_id == event_id))
+        db.add_all([self.build(event_id=event_id, data=record) for record in records])
+        await db.flush()
+
+    async def get_by_event(self, db: AsyncSession, *, event_id: str) -> List[EventEntry]:
+        result = await db.execute(
+            select(EventEntry).where(EventEntry.event_id == event_id).order_by(EventEntry.id.asc())
+        )
+        return result.scalars().all()
+
+    async def migrate_legacy_json_data(self, db: AsyncSession) -> int:
+        """
+        Move records from the legacy events.json_data blobs into event_entries.
+        Idempotent: migrated events have their blob set to NULL. Returns the number of events migrated.
+        """
+        result = await db.execute(select(Event).where(Event.legacy_json_data.isnot(None)))
+        events = result.scalars().all()
+        for event in events:
+            for record in event.legacy_json_data or []:
+                if isinstance(record, dict):
+                    db.add(self.build(event_id=event.id, data=record))
+            event.legacy_json_data = null()
+            db.add(event)
+        await db.commit()
+        return len(events)
+
+event_entry = CRUDEventEntry(EventEntry)
@@ -0,0 +1,173 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, case, func
+from app.crud.base import CRUDBase, dialect_insert
+from app.models.event import Event
+from app.models.event_entry import EventEntry
+from app.models.event_stat import EventStat, EventStatDimension, NO_HOSPITAL
+from app.models.user import User
+from app.schemas.event import EventStatRow
+from app.utils.timeseries import naive_utc
+
+# (dimension, value) -> {"event_count", "entry_count", "first_at", "last_at"}
+Deltas = Dict[Tuple[str, str], Dict[str, Any]]
+
+def _bump(deltas: Deltas, dimension: str, value: str, *, events: int = 0, entries: int = 0, at: Optional[datetime] = None):
+    row = deltas.setdefault((dimension, value), {"event_count": 0, "entry_count": 0, "first_at": None, "last_at": None})
+    row["event_count"] += events
+    row["entry_count"] += entries
+    if at is not None:
+        if row["first_at"] is None or at < row["first_at"]:
+            row["first_at"] = at
+        if row["last_at"] is None or at > row["last_at"]:
+            row["last_at"] = at
+
+def entry_deltas(entries: Iterable[Tuple[Dict[str, Any], Optional[str], Optional[datetime]]], deltas: Optional[Deltas] = None) -> Deltas:
+    """
+    Fold (data, place_name, appended_at) tuples into aggregate deltas.
+    Metadata keys (leading underscore) are not counted as data keys.
+    """
+    deltas = deltas if deltas is not None else {}
+    for data, place_name, appended_at in entries:
+        at = naive_utc(appended_at)
+        if place_name:
+            _bump(deltas, EventStatDimension.PLACE.value, place_name, entries=1, at=at)
+        for key in data or {}:
+            if not key.startswith("_"):
+                _bump(deltas, EventStatDimension.KEY.value, key, entries=1, at=at)
+    return deltas
+
+class CRUDEventStat(CRUDBase[EventStat, EventStatRow, EventStatRow]):
+    async def hospital_for_event(self, db: AsyncSession, *, event: Event) -> str:
+        """
+        Events are scoped to their creator's hospital (same rule as the events API filters).
+        """
+        result = await db.execute(select(User.hospital_id).where(User.id == event.created_by_id))
+        return result.scalars().first() or NO_HOSPITAL
+
+    async def apply(self, db: AsyncSession, *, hospital_id: str, deltas: Deltas) -> None:
+        """
+        Upsert deltas in one statement: counters are added, time ranges widened.
+        Runs inside the caller's transaction.
+        """
+        if not deltas:
+            return
+        stmt = dialect_insert(db)(EventStat).values([
+            {
+                "hospital_id": hospital_id or NO_HOSPITAL,
+                "dimension": dimension,
+                "value": value,
+                **row,
+            }
+            for (dimension, value), row in deltas.items()
+        ])
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["hospital_id", "dimension", "value"],
+            set_={
+                "event_count": EventStat.event_count + excluded.event_count,
+                "entry_count": EventStat.entry_count + excluded.entry_count,
+                "first_at": case(
+                    (EventStat.first_at.is_(None), excluded.first_at),
+                    (excluded.first_at < EventStat.first_at, excluded.first_at),
+                    else_=EventStat.first_at,
+                ),
+                "last_at": case(
+                    (EventStat.last_at.is_(None), excluded.last_at),
+                    (excluded.last_at > EventStat.last_at, excluded.last_at),
+                    else_=EventStat.last_at,
+                ),
+            },
+        )
+        await db.execute(stmt)
+
+    async def record_entries(self, db: AsyncSession, *, hospital_id: str, entries: List[EventEntry]) -> None:
+        deltas = entry_deltas((e.data, e.place_name, e.appended_at) for e in entries)
+        await self.apply(db, hospital_id=hospital_id, deltas=deltas)
+
+    async def record_keys(
+        self, db: AsyncSession, *, hospital_id: str, added: Iterable[str] = (), removed: Iterable[str] = ()
+    ) -> None:
+        deltas: Deltas = {}
+        for key in set(added):
+            _bump(deltas, EventStatDimension.KEY.value, key, events=1)
+        for key in set(removed):
+            _bump(deltas, EventStatDimension.KEY.value, key, events=-1)
+        await self.apply(db, hospital_id=hospital_id, deltas=deltas)
+
+    async def rebuild(self, db: AsyncSession, *, hospital_id: Optional[str] = None) -> None:
+        """
+        Recompute aggregates from event_entries for one hospital (or all when None).
+        Used for the initial backfill and after a full json_data replace.
+        """
+        creator_hospital = func.coalesce(User.hospital_id, NO_HOSPITAL)
+        per_hospital: Dict[str, Deltas] = {}
+
+        keys_query = select(Event.keys, creator_hospital).join(User, Event.created_by_id == User.id, isouter=True)
+        entries_query = (
+            select(EventEntry.data, EventEntry.place_name, EventEntry.appended_at, creator_hospital)
+            .join(Event, EventEntry.event_id == Event.id)
+            .join(User, Event.created_by_id == User.id, isouter=True)
+        )
+        if hospital_id is not None:
+            keys_query = keys_query.where(creator_hospital == hospital_id)
+            entries_query = entries_query.where(creator_hospital == hospital_id)
+
+        for keys, hosp in (await db.execute(keys_query)).all():
+            deltas = per_hospital.setdefault(hosp, {})
+            for key in set(keys or []):
+                _bump(deltas, EventStatDimension.KEY.value, key, events=1)
+
+        stream = await db.stream(entries_query.execution_options(yield_per=1000))
+        async for data, place_name, appended_at, hosp in stream:
+            entry_deltas([(data, place_name, appended_at)], per_hospital.setdefault(hosp, {}))
+
+        clear = delete(EventStat)
+        if hospital_id is not None:
+            clear = clear.where(EventStat.hospital_id == hospital_id)
+        await db.execute(clear)
+        for hosp, deltas in per_hospital.items():
+            await self.apply(db, hospital_id=hosp, deltas=deltas)
+
+    async def ensure_built(self, db: AsyncSession) -> bool:
+        """
+        Backfill aggregates once if the table is empty but entries exist. Returns True if it rebuilt.
+        """
+        has_stats = (await db.execute(select(EventStat.id).limit(1))).first()
+        has_entries = (await db.execute(select(EventEntry.id).limit(1))).first()
+        if has_stats or not has_entries:
+            return False
+        await self.rebuild(db)
+        await db.commit()
+        return True
+
+    async def get_rows(
+        self, db: AsyncSession, *, hospital_id: Optional[str] = None, dimension: Optional[str] = None
+    ) -> List[EventStat]:
+        """
+        hospital_id=None means every hospital (super admin).
+        """
+        query = select(EventStat).order_by(EventStat.dimension, EventStat.value)
+        if hospital_id is not None:
+            query = query.where(EventStat.hospital_id == hospital_id)
+        if dimension:
+            query = query.where(EventStat.dimension == dimension)
+        result = await db.execute(query)
+        return result.scalars().all()
+
+    async def get_filters(self, db: AsyncSession, *, hospital_id: Optional[str] = None) -> Dict[str, List[str]]:
+        places_query = select(EventStat.value).distinct().where(
+            EventStat.dimension == EventStatDimension.PLACE.value, EventStat.entry_count > 0
+        )
+        keys_query = select(EventStat.value).distinct().where(
+            EventStat.dimension == EventStatDimension.KEY.value, EventStat.event_count > 0
+        )
+        if hospital_id is not None:
+            places_query = places_query.where(EventStat.hospital_id == hospital_id)
+            keys_query = keys_query.where(EventStat.hospital_id == hospital_id)
+        places = (await db.execute(places_query)).scalars().all()
+        keys = (await db.execute(keys_query)).scalars().all()
+        return {"places": sorted(places), "available_keys": sorted(keys)}
+
+event_stat = CRUDEventStat(EventStat)
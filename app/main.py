@@ -28,6 +28,10 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Failed to start agent worker: {e}")
 
+    # Shared HTTP pool for model endpoints and media downloads
+    from app.core.http import http_pool
+    await http_pool.start()
+
     # Initialize lightweight AI Clients
     try:
         get_vqa_chain()
@@ -40,6 +44,11 @@ async def lifespan(app: FastAPI):
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # Columns added to existing tables (create_all skips those)
+        from app.core.schema import upgrade_schema
+        added = await upgrade_schema(conn)
+        if added:
+            logger.info(f"Schema upgraded: {', '.join(added)}")
     
     async with SessionLocal() as db:
         # Seed Specializations
@@ -63,9 +72,36 @@ async def lifespan(app: FastAPI):
             db.add(superuser)
         
         await db.commit()
+
+        # Move any legacy events.json_data blobs into event_entries (no-op once migrated)
+        from app.crud.event_entry import event_entry as crud_event_entry
+        migrated = await crud_event_entry.migrate_legacy_json_data(db)
+        if migrated:
+            logger.info(f"Migrated {migrated} event(s) to event_entries.")
+
+        # Backfill dashboard aggregates on first start with event_stats
+        from app.crud.event_stat import event_stat as crud_event_stat
+        if await crud_event_stat.ensure_built(db):
+            logger.info("Built event_stats aggregates.")
     
+    # Backfill the chat conversations summary on first start
+    from app.crud.conversation import conversation as crud_conversation
+    async with SessionLocal() as db:
+        if await crud_conversation.ensure_built(db):
+            logger.info("Built chat conversations summary.")
+
+    # Chat backplane (cross-worker message routing)
+    from app.api.chat import manager as chat_manager
+    await chat_manager.start()
+    from app.core.chat_writer import chat_writer
+    chat_writer.start()
+
     yield
     # Shutdown
+    await chat_writer.stop()
+    await chat_manager.stop()
+    await http_pool.stop()
+
     if agent_process:
         logger.info("Stopping LiveKit Agent Worker...")
         agent_process.terminate()
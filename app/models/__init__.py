@@ -8,6 +8,8 @@ from app.models.medicine import Medicine, InventoryLog, InventoryChangeType
 from app.models.lab_test import LabTest
 from app.models.floor import Floor
 from app.models.event import Event
+from app.models.event_entry import EventEntry
+from app.models.event_stat import EventStat, EventStatDimension
 from app.models.availability import Availability, StaffType, DayOfWeek
 from app.models.call_script import CallScript
 from app.models.document import Document
@@ -17,3 +19,4 @@ from app.models.appointment_vital import AppointmentVital
 from app.models.lab_report import LabReport
 from app.models.user_memory import UserMemory
 from app.models.doctor_patient_chat import DoctorPatientChat
+from app.models.conversation import Conversation
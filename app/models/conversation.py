@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, Index
+from app.core.database import Base
+
+class Conversation(Base):
+    """
+    One row per chatting user pair, maintained on every message write.
+    The pair is stored in canonical order: user_a_id < user_b_id.
+    """
+    __tablename__ = "conversations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_a_id = Column(String, ForeignKey("users.id"), nullable=False)
+    user_b_id = Column(String, ForeignKey("users.id"), nullable=False)
+    last_message_id = Column(Integer, ForeignKey("doctor_patient_chats.id"), nullable=True)
+    last_message_at = Column(DateTime, nullable=True)
+    unread_a = Column(Integer, nullable=False, default=0) # Messages user_a has not read
+    unread_b = Column(Integer, nullable=False, default=0) # Messages user_b has not read
+
+    __table_args__ = (
+        UniqueConstraint("user_a_id", "user_b_id", name="uq_conversations_pair"),
+        Index("ix_conversations_user_b_id", "user_b_id"),
+    )
+
+def canonical_pair(user1_id: str, user2_id: str) -> tuple[str, str]:
+    return (user1_id, user2_id) if user1_id < user2_id else (user2_id, user1_id)
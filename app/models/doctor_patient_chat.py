@@ -1,8 +1,17 @@
 from datetime import datetime
 from pydantic import BaseModel
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
+from app.models.conversation import canonical_pair
+
+def make_pair_key(user1_id: str, user2_id: str) -> str:
+    """Order-independent key for a user pair: '<smaller id>:<larger id>'."""
+    return ":".join(canonical_pair(user1_id, user2_id))
+
+def _default_pair_key(context) -> str:
+    params = context.get_current_parameters()
+    return make_pair_key(params["sender_id"], params["receiver_id"])
 
 class DoctorPatientChat(Base):
     __tablename__ = "doctor_patient_chats"
@@ -10,7 +19,12 @@ class DoctorPatientChat(Base):
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
     receiver_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    # Canonical conversation key; (pair_key, id) serves history paging in both directions
+    pair_key = Column(String, nullable=True, default=_default_pair_key)
     message = Column(Text, nullable=False)
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_doctor_patient_chats_pair_key_id", "pair_key", "id"),
+    )
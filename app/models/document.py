@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from app.core.database import Base
@@ -16,5 +16,7 @@ class Document(Base):
     patient_id = Column(String, ForeignKey("patients.id"), nullable=True)
     doctor_id = Column(String, ForeignKey("doctors.id"), nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # SigLIP zero-shot results per label set: {"Normal|Fracture|...": {"prediction", "confidence", "scores", "classified_at"}}
+    classifications = Column(JSON, nullable=True)
 
     owner = relationship("User", back_populates="documents")
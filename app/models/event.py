@@ -10,8 +10,9 @@ class Event(Base):
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     event_name = Column(String, nullable=True)
     
-    # Stores a list of JSON objects: [{"key": "value", "timestamp": "...", "nurse": "..."}]
-    json_data = Column(JSON, default=list) 
+    # Legacy storage for appended records. Records now live in `event_entries`;
+    # this column is only read by the migration and is NULL once migrated.
+    legacy_json_data = Column("json_data", JSON, nullable=True)
 
     # Stores a list of strings defining the expected keys for this event type
     keys = Column(JSON, default=list)
@@ -25,3 +26,18 @@ class Event(Base):
     # Relationships
     created_by = relationship("User", foreign_keys=[created_by_id])
     updated_by = relationship("User", foreign_keys=[updated_by_id])
+    entries = relationship(
+        "EventEntry",
+        back_populates="event",
+        order_by="EventEntry.id",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    @property
+    def json_data(self):
+        """
+        Compatibility view: the list of appended records, in append order.
+        Requires `entries` to be loaded (use selectinload(Event.entries) in async queries).
+        """
+        return [entry.data for entry in self.entries]
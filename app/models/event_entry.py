@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+from app.utils.timeseries import naive_utc
+
+class EventEntry(Base):
+    __tablename__ = "event_entries"
+
+    # Autoincrement id doubles as the append order within an event
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(String, ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
+
+    # The appended record exactly as served in Event.json_data (including _appended_by / _appended_at)
+    data = Column(JSON, nullable=False)
+
+    # Denormalized from data for indexed filtering
+    place_name = Column(String, nullable=True, index=True)
+    # Naive UTC, like every value written here (tz-less column; asyncpg rejects aware datetimes)
+    appended_at = Column(DateTime, default=lambda: naive_utc(datetime.now(timezone.utc)), index=True)
+    appended_by_id = Column(String, ForeignKey("users.id"), nullable=True)
+
+    # Client-generated key for offline sync replays; unique per event when set
+    idempotency_key = Column(String, nullable=True)
+
+    # Relationships
+    event = relationship("Event", back_populates="entries")
+    appended_by = relationship("User", foreign_keys=[appended_by_id])
+
+    __table_args__ = (
+        Index("ix_event_entries_event_id_id", "event_id", "id"),
+        Index("uq_event_entries_event_id_idempotency_key", "event_id", "idempotency_key", unique=True),
+    )
@@ -0,0 +1,33 @@
+import enum
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from app.core.database import Base
+
+# Events created by users without a hospital are aggregated under this bucket
+NO_HOSPITAL = ""
+
+class EventStatDimension(str, enum.Enum):
+    PLACE = "place"
+    KEY = "key"
+
+class EventStat(Base):
+    """
+    Materialized per-hospital dashboard aggregate for one place or key.
+    Maintained incrementally by app.crud.event_stat on event create/append/update.
+    """
+    __tablename__ = "event_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    hospital_id = Column(String, nullable=False, default=NO_HOSPITAL, index=True)
+    dimension = Column(String, nullable=False)  # EventStatDimension
+    value = Column(String, nullable=False)
+
+    # Number of events declaring this key in Event.keys (keys only)
+    event_count = Column(Integer, nullable=False, default=0)
+    # Number of appended entries with this place / containing this key
+    entry_count = Column(Integer, nullable=False, default=0)
+    first_at = Column(DateTime, nullable=True)
+    last_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("hospital_id", "dimension", "value", name="uq_event_stats_hospital_dimension_value"),
+    )
@@ -25,3 +25,21 @@ class ChatContact(BaseModel):
     hospital_name: str | None = None
     specialization: str | None = None
     last_message: ChatMessageResponse | None = None
+    unread_count: int = 0
+
+class ChatReadReceipt(BaseModel):
+    contact_id: str
+    up_to_id: int
+    marked: int
+
+class ConversationResponse(BaseModel):
+    id: int
+    user_a_id: str
+    user_b_id: str
+    last_message_id: int | None = None
+    last_message_at: datetime | None = None
+    unread_a: int = 0
+    unread_b: int = 0
+
+    class Config:
+        from_attributes = True
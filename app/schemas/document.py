@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
+from pydantic import Field
 
 class DocumentBase(BaseModel):
     title: str
@@ -18,6 +19,32 @@ class Document(DocumentBase):
     user_id: str
     appointment_id: Optional[str] = None
     created_at: datetime
+    classifications: Optional[Dict[str, Any]] = None
 
     class Config:
         from_attributes = True
+
+class ClassifyItem(BaseModel):
+    # Either a stored document (result is saved on it) or a bare image URL
+    document_id: Optional[str] = None
+    image_url: Optional[str] = None
+    candidates: Optional[List[str]] = None # Falls back to the request's candidates
+
+class ClassifyBatchRequest(BaseModel):
+    items: List[ClassifyItem] = Field(..., min_length=1, max_length=200)
+    candidates: Optional[List[str]] = None # Default: standard screening labels
+    force: bool = False # Re-run even if the document already has a result for this label set
+
+class ClassifyAppointmentRequest(BaseModel):
+    candidates: Optional[List[str]] = None
+    force: bool = False
+
+class ClassifyResult(BaseModel):
+    document_id: Optional[str] = None
+    image_url: Optional[str] = None
+    candidates: List[str]
+    prediction: Optional[str] = None
+    confidence: Optional[float] = None
+    scores: Optional[Dict[str, float]] = None
+    stored: bool = False # Served from the document row without calling the model
+    error: Optional[str] = None
@@ -1,6 +1,7 @@
 from typing import List, Optional, Any, Dict
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from app.utils.timeseries import Bucket, Aggregate
 
 # Shared properties
 class EventBase(BaseModel):
@@ -19,6 +20,32 @@ class EventUpdate(EventBase):
 class EventDataAppend(BaseModel):
     data: Dict[str, Any]
 
+# Properties for a batched, idempotent append (offline nurse sync)
+class EventBulkEntry(BaseModel):
+    idempotency_key: str = Field(..., min_length=1, max_length=128) # Client-generated, e.g. a UUID
+    data: Dict[str, Any]
+    recorded_at: Optional[datetime] = None # When the entry was collected offline; defaults to sync time
+
+class EventDataBulkAppend(BaseModel):
+    entries: List[EventBulkEntry] = Field(..., min_length=1, max_length=1000)
+
+class EventBulkEntryResult(BaseModel):
+    idempotency_key: str
+    status: str # "created" or "duplicate"
+    entry_id: Optional[int] = None
+
+class EventBulkAppendResult(BaseModel):
+    event_id: str
+    created: int
+    duplicates: int
+    results: List[EventBulkEntryResult]
+
+# Properties to create a single appended record (one row in event_entries)
+class EventEntryCreate(BaseModel):
+    event_id: str
+    data: Dict[str, Any]
+    appended_by_id: Optional[str] = None
+
 # Properties to return to client
 class Event(EventBase):
     id: str
@@ -32,10 +59,64 @@ class Event(EventBase):
     class Config:
         from_attributes = True
 
+# Event listing: metadata and record count, without the (unbounded) json_data
+class EventSummary(EventBase):
+    id: str
+    keys: Optional[List[str]] = None
+    created_by_id: str
+    updated_by_id: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    entry_count: int = 0
+
+    class Config:
+        from_attributes = True
+
+# Returned by POST /events/{id}/entries: the event without its json_data, plus the new record
+class EventAppendResult(EventBase):
+    id: str
+    keys: Optional[List[str]] = None
+    created_by_id: str
+    updated_by_id: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    entry_id: int
+    entry: Dict[str, Any]
+
+    class Config:
+        from_attributes = True
+
 class EventStatsFilters(BaseModel):
     places: List[str]
     available_keys: List[str]
 
+class EventStatRow(BaseModel):
+    hospital_id: str
+    dimension: str # "place" or "key"
+    value: str
+    event_count: int = 0
+    entry_count: int = 0
+    first_at: Optional[datetime] = None
+    last_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 class EventGraphDataRequest(BaseModel):
     place_name: Optional[str] = None
     event_id: Optional[str] = None
+
+class EventGraphPoint(BaseModel):
+    t: datetime # Bucket start (UTC)
+    value: Optional[float] = None
+    count: int
+
+class EventGraphSeries(BaseModel):
+    key: str
+    place_name: Optional[str] = None
+    event_id: Optional[str] = None
+    bucket: Bucket
+    bucket_seconds: int # Effective bucket width after downsampling
+    aggregate: Aggregate
+    total_entries: int
+    points: List[EventGraphPoint]
@@ -0,0 +1,148 @@
+"""
+WAV normalization for the HF Space audio models.
+
+Clients upload whatever their recorder produced (44.1/48 kHz, stereo, float32, 24-bit);
+MedASR and HeAR both work on 16 kHz mono. Converting here, before upload, cuts payloads
+4-6x. Everything is vectorized NumPy:
+- decode: PCM 8/16/24/32-bit, IEEE float 32/64 and WAVE_FORMAT_EXTENSIBLE
+- downmix: mean over channels
+- resample: windowed-sinc low-pass (block-wise FFT convolution, so memory stays flat for
+  long recordings) when downsampling, then decimation for integer ratios or linear
+  interpolation otherwise
+
+Anything that is not a parseable WAV (WebM, MP3, ...) is passed through unchanged.
+"""
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+_PCM = 1
+_IEEE_FLOAT = 3
+_EXTENSIBLE = 0xFFFE
+
+
+def decode_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    """Parse a RIFF/WAVE file. Returns (float32 samples shaped (frames, channels), sample_rate)."""
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE file")
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id, size = data[pos:pos + 4], struct.unpack_from("<I", data, pos + 4)[0]
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            fmt_tag, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body)
+            if fmt_tag == _EXTENSIBLE and size >= 40:
+                fmt_tag = struct.unpack_from("<H", data, body + 24)[0]  # First two bytes of the SubFormat GUID
+            fmt = (fmt_tag, channels, rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            # Streaming writers leave the size at 0 / 0xFFFFFFFF: take what is there
+            payload = data[body:min(len(data), body + size)] if size else data[body:]
+            return _samples(payload, *fmt), fmt[2]
+        pos = body + size + (size & 1)
+    raise ValueError("WAV file has no data chunk")
+
+
+def _samples(payload: bytes, fmt_tag: int, channels: int, rate: int, bits: int) -> np.ndarray:
+    if channels < 1 or rate < 1 or bits < 8 or bits % 8:
+        raise ValueError(f"Invalid WAV format ({channels} channels, {rate} Hz, {bits}-bit)")
+    width = bits // 8
+    payload = payload[:len(payload) - len(payload) % (width * channels)]
+
+    if fmt_tag == _IEEE_FLOAT and bits in (32, 64):
+        x = np.frombuffer(payload, dtype="<f4" if bits == 32 else "<f8").astype(np.float32)
+    elif fmt_tag == _PCM and bits == 8:
+        x = (np.frombuffer(payload, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif fmt_tag == _PCM and bits == 16:
+        x = np.frombuffer(payload, dtype="<i2").astype(np.float32) / 32768.0
+    elif fmt_tag == _PCM and bits == 24:
+        b = np.frombuffer(payload, dtype=np.uint8).reshape(-1, 3)
+        # Place the 3 bytes in the top of an int32 so the sign extends, then shift back
+        wide = np.zeros((len(b), 4), dtype=np.uint8)
+        wide[:, 1:] = b
+        x = (wide.view("<i4").ravel() >> 8).astype(np.float32) / 8388608.0
+    elif fmt_tag == _PCM and bits == 32:
+        x = np.frombuffer(payload, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported WAV encoding (format {fmt_tag}, {bits}-bit)")
+    return x.reshape(-1, channels)
+
+
+def _lowpass(x: np.ndarray, cutoff: float, taps: int = 101, block: int = 1 << 14) -> np.ndarray:
+    """
+    Hamming-windowed sinc low-pass; cutoff in cycles/sample (< 0.5). Overlap-add over
+    `block`-sample blocks, so temporaries are a few blocks in size whatever the input length.
+    """
+    n = np.arange(taps) - (taps - 1) / 2
+    h = (2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)).astype(np.float32)
+    h /= h.sum()
+    size = 1 << int(block + taps - 2).bit_length()
+    kernel = np.fft.rfft(h, size)
+    y = np.zeros(len(x) + taps - 1, dtype=np.float32)
+    for start in range(0, len(x), block):
+        segment = x[start:start + block]
+        end = start + len(segment) + taps - 1
+        y[start:end] += np.fft.irfft(np.fft.rfft(segment, size) * kernel, size)[:end - start]
+    start = (taps - 1) // 2
+    return y[start:start + len(x)]
+
+
+def resample(x: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """Resample a 1-D float signal."""
+    if src_rate == dst_rate or not len(x):
+        return x
+    if src_rate > dst_rate:
+        # Keep 90% of the target Nyquist band, suppress the rest before decimating
+        x = _lowpass(x, 0.45 * dst_rate / src_rate)
+        if src_rate % dst_rate == 0:
+            return x[::src_rate // dst_rate]
+    out_len = int(len(x) * dst_rate / src_rate)
+    positions = np.arange(out_len, dtype=np.float64) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(x)), x).astype(np.float32)
+
+
+def encode_wav(pcm: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """int16 mono samples -> WAV bytes."""
+    body = pcm.astype("<i2").tobytes()
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + len(body), b"WAVE",
+        b"fmt ", 16, _PCM, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", len(body),
+    )
+    return header + body
+
+
+def to_pcm16(data: bytes, sample_rate: int = SAMPLE_RATE) -> Optional[np.ndarray]:
+    """Decode a WAV to mono int16 at `sample_rate`. None if it is not a parseable WAV."""
+    try:
+        samples, rate = decode_wav(data)
+    except (ValueError, struct.error):
+        return None
+    mono = samples[:, 0] if samples.shape[1] == 1 else samples.mean(axis=1)
+    mono = resample(mono, rate, sample_rate)
+    return (np.clip(mono, -1.0, 32767 / 32768) * 32768.0).astype(np.int16)
+
+
+def normalize_wav(data: bytes, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """
+    Re-encode a WAV as 16 kHz mono int16. Already-conforming WAVs and non-WAV
+    payloads are returned as-is.
+    """
+    if _is_normalized(data, sample_rate):
+        return data
+    pcm = to_pcm16(data, sample_rate)
+    return data if pcm is None else encode_wav(pcm, sample_rate)
+
+
+def _is_normalized(data: bytes, sample_rate: int) -> bool:
+    if len(data) < 36 or data[:4] != b"RIFF" or data[12:16] != b"fmt ":
+        return False
+    fmt_tag, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", data, 20)
+    return (fmt_tag, channels, rate, bits) == (_PCM, 1, sample_rate, 16)
@@ -1,5 +1,5 @@
 import io
-import httpx
+from app.core.http import http_pool
 from pypdf import PdfReader
 from fastapi import HTTPException
 
@@ -8,10 +8,7 @@ async def extract_text_from_pdf_url(url: str) -> str:
     Download PDF from URL and extract text using pypdf.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            pdf_bytes = io.BytesIO(response.content)
+        pdf_bytes = io.BytesIO(await http_pool.fetch_bytes(url))
             
         reader = PdfReader(pdf_bytes)
         text = ""
@@ -0,0 +1,95 @@
+"""
+Ordered concurrent pipeline.
+
+Runs up to `max_in_flight` calls of `worker` at once and hands the results to `emit`
+strictly in submission order, each tagged with its sequence number. `submit` waits
+while the window is full, so a producer reading from a socket stops reading until a
+slot frees up (backpressure) instead of buffering without bound.
+
+If `emit` raises (e.g. the client's socket is gone), the pipeline stops: outstanding
+work is cancelled, its slots are released, and the error is re-raised from the next
+`submit` or from `drain`.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class OrderedPipeline:
+    def __init__(
+        self,
+        worker: Callable[[Any], Awaitable[Any]],
+        emit: Callable[[int, Any, Optional[BaseException]], Awaitable[None]],
+        max_in_flight: int = 4,
+    ):
+        self.worker = worker
+        self.emit = emit
+        self.max_in_flight = max(1, max_in_flight)
+        self._window = asyncio.Semaphore(self.max_in_flight)
+        self._pending: asyncio.Queue = asyncio.Queue()
+        self._emitter = asyncio.create_task(self._run())
+        self.submitted = 0
+        self.error: Optional[BaseException] = None
+
+    async def submit(self, item: Any) -> int:
+        """Start processing `item` once a slot is free. Returns its sequence number."""
+        if self.error is not None:
+            raise self.error
+        await self._window.acquire()
+        if self.error is not None:
+            self._window.release()
+            raise self.error
+        seq = self.submitted
+        self.submitted += 1
+        await self._pending.put((seq, asyncio.create_task(self.worker(item))))
+        return seq
+
+    @property
+    def in_flight(self) -> int:
+        return self.max_in_flight - self._window._value
+
+    async def _run(self):
+        while True:
+            entry = await self._pending.get()
+            if entry is None:
+                return
+            seq, task = entry
+            if self.error is not None:
+                # Emitting already failed; just free the slot
+                task.cancel()
+                self._window.release()
+                continue
+            try:
+                result, error = await task, None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result, error = None, e
+            try:
+                await self.emit(seq, result, error)
+            except Exception as e:
+                logger.error(f"Pipeline emit failed at seq {seq}: {e}")
+                self.error = e
+            finally:
+                self._window.release()
+
+    async def drain(self):
+        """Wait until everything submitted so far has been emitted, then stop. Re-raises an emit error."""
+        await self._pending.put(None)
+        await self._emitter
+        if self.error is not None:
+            raise self.error
+
+    async def cancel(self):
+        """Drop outstanding work (e.g. the client went away)."""
+        self._emitter.cancel()
+        while not self._pending.empty():
+            entry = self._pending.get_nowait()
+            if entry is not None:
+                entry[1].cancel()
+        try:
+            await self._emitter
+        except (asyncio.CancelledError, Exception):
+            pass
@@ -0,0 +1,72 @@
+"""
+Cross-chunk transcript stitching.
+
+Consecutive ASR chunks often overlap: a word cut at the boundary comes back in both
+chunks, or a partial word ("hypert") is completed in the next one ("hypertension").
+`TranscriptStitcher` keeps the last `hold` tokens of the transcript as a provisional
+tail, aligns each new chunk against it (longest tail suffix == chunk prefix, compared
+case- and punctuation-insensitively) and merges the overlap away. Everything before the
+tail is final ("stable") and never changes, so clients can render it incrementally.
+
+A partial word is only merged for fixed-size chunks (`split_words=True`), and only if
+the chunk also repeats the word before it ("high hypert" + "high hypertension ..."):
+a lone prefix match such as "the" + "there" or "heart" + "heartburn" is usually two
+real words. Chunks cut at silence (VAD segments) cannot split a word, so they never
+get the partial-word merge.
+
+Alignment only looks at the bounded tail, so building the full transcript is linear in
+its length.
+"""
+import re
+from typing import List, Tuple
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def _norm(token: str) -> str:
+    return _NON_WORD.sub("", token.lower())
+
+
+class TranscriptStitcher:
+    def __init__(self, hold: int = 6, min_partial: int = 3):
+        self.hold = hold
+        self.min_partial = min_partial
+        self.stable: List[str] = []
+        self.tail: List[str] = []
+
+    def _overlap(self, tokens: List[str], split_words: bool) -> int:
+        """Number of tail tokens the new chunk repeats."""
+        tail = [_norm(t) for t in self.tail]
+        head = [_norm(t) for t in tokens[:self.hold]]
+        for k in range(min(len(tail), len(head)), 0, -1):
+            if tail[-k:] == head[:k]:
+                return k
+        if not split_words or not tail or len(tail[-1]) < self.min_partial:
+            return 0
+        # Word split across the boundary, anchored by at least one repeated word before it:
+        # "high hypert" + "high hypertension ..."
+        for k in range(min(len(tail), len(head)), 1, -1):
+            word = head[k - 1]
+            if tail[-k:-1] == head[:k - 1] and len(word) > len(tail[-1]) and word.startswith(tail[-1]):
+                return k
+        return 0
+
+    def add(self, text: str, split_words: bool = True) -> Tuple[List[str], List[str]]:
+        """
+        Merge a chunk. Returns (tokens that just became stable, current provisional tail).
+        `split_words=False` for chunks cut at silence, where no word can straddle the boundary.
+        """
+        tokens = text.split()
+        if not tokens:
+            return [], list(self.tail)
+        k = self._overlap(tokens, split_words)
+        merged = self.tail[:len(self.tail) - k] + tokens
+        cut = max(0, len(merged) - self.hold)
+        newly_stable = merged[:cut]
+        self.stable.extend(newly_stable)
+        self.tail = merged[cut:]
+        return newly_stable, list(self.tail)
+
+    def finish(self) -> str:
+        """Full transcript: stable tokens plus the remaining tail."""
+        return " ".join(self.stable + self.tail)
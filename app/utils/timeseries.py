@@ -0,0 +1,152 @@
+"""
+Vectorized (NumPy) time-bucketed aggregation for event graph data.
+"""
+import enum
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+class Bucket(str, enum.Enum):
+    HOUR = "hour"
+    DAY = "day"
+    WEEK = "week"
+
+class Aggregate(str, enum.Enum):
+    COUNT = "count"
+    SUM = "sum"
+    MEAN = "mean"
+    MIN = "min"
+    MAX = "max"
+    P50 = "p50"
+    P90 = "p90"
+    P95 = "p95"
+    P99 = "p99"
+
+BUCKET_SECONDS = {
+    Bucket.HOUR: 3600,
+    Bucket.DAY: 86400,
+    Bucket.WEEK: 7 * 86400,
+}
+
+_EPOCH = datetime(1970, 1, 1)
+# 1970-01-01 was a Thursday; shift so weeks start on Monday
+_EPOCH_WEEKDAY_OFFSET_S = 3 * 86400
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Aware datetimes are converted to UTC before dropping tzinfo, to compare with the
+    naive UTC timestamps stored by the models. Naive values are taken as UTC already.
+    """
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def to_epoch_seconds(timestamps: Sequence[datetime]) -> np.ndarray:
+    """
+    Naive datetimes are taken as UTC (as stored by the models).
+    Timedelta arithmetic is ~10x faster than numpy's datetime64 parsing of datetime objects.
+    """
+    def _seconds(t: datetime) -> float:
+        if t.tzinfo is not None:
+            t = t.astimezone(timezone.utc).replace(tzinfo=None)
+        return (t - _EPOCH).total_seconds()
+    seconds = np.fromiter((_seconds(t) for t in timestamps), dtype=np.float64, count=len(timestamps))
+    return np.floor(seconds).astype(np.int64)
+
+def to_float_array(values: Sequence[Any]) -> np.ndarray:
+    """
+    Coerce JSON values (numbers or numeric strings) to float64, NaN where not numeric.
+    """
+    def _coerce(value):
+        if isinstance(value, bool) or value is None:
+            return math.nan
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return math.nan
+    return np.fromiter((_coerce(v) for v in values), dtype=np.float64, count=len(values))
+
+def _group_percentile(sorted_vals: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    # Linear interpolation (numpy's default method), evaluated for every group at once
+    pos = starts + q * (counts - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, starts + counts - 1)
+    frac = pos - lo
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * frac
+
+def bucket_series(
+    timestamps: Sequence[datetime],
+    values: Sequence[Any],
+    *,
+    bucket: Bucket,
+    aggregate: Aggregate,
+    max_points: int,
+) -> Dict[str, Any]:
+    """
+    Aggregate (timestamp, value) pairs into time buckets.
+
+    `count` counts every non-null value; the other aggregates use numeric values only.
+    If the series would exceed `max_points`, buckets are widened by an integer factor
+    (still aligned to the base bucket) and re-aggregated from the raw values.
+
+    Returns {"bucket_seconds": int, "points": [{"t": datetime, "value": float|None, "count": int}]}.
+    """
+    width = BUCKET_SECONDS[Bucket(bucket)]
+    aggregate = Aggregate(aggregate)
+    if len(timestamps) == 0:
+        return {"bucket_seconds": width, "points": []}
+
+    ts = to_epoch_seconds(timestamps)
+    if aggregate == Aggregate.COUNT:
+        vals = np.array([v is not None for v in values], dtype=np.float64)
+        mask = vals > 0
+    else:
+        vals = to_float_array(values)
+        mask = ~np.isnan(vals)
+    ts, vals = ts[mask], vals[mask]
+    if ts.size == 0:
+        return {"bucket_seconds": width, "points": []}
+
+    offset = _EPOCH_WEEKDAY_OFFSET_S if bucket == Bucket.WEEK else 0
+    keys = (ts + offset) // width
+
+    # Downsample by widening buckets
+    first_key = keys.min()
+    span = int(keys.max() - first_key) + 1
+    factor = max(1, math.ceil(span / max(1, max_points)))
+    keys = first_key + ((keys - first_key) // factor) * factor
+    width_out = width * factor
+
+    groups, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+
+    if aggregate == Aggregate.COUNT:
+        result = counts.astype(np.float64)
+    elif aggregate == Aggregate.SUM:
+        result = np.bincount(inverse, weights=vals, minlength=groups.size)
+    elif aggregate == Aggregate.MEAN:
+        result = np.bincount(inverse, weights=vals, minlength=groups.size) / counts
+    else:
+        # Sort by (group, value) so each group is a contiguous, ordered slice
+        order = np.lexsort((vals, inverse))
+        sorted_vals = vals[order]
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        if aggregate == Aggregate.MIN:
+            result = sorted_vals[starts]
+        elif aggregate == Aggregate.MAX:
+            result = sorted_vals[starts + counts - 1]
+        else:
+            q = int(aggregate.value[1:]) / 100.0
+            result = _group_percentile(sorted_vals, starts, counts, q)
+
+    starts_s = groups * width - offset
+    points: List[Dict[str, Optional[Any]]] = [
+        {
+            "t": datetime.fromtimestamp(int(t), tz=timezone.utc),
+            "value": float(v),
+            "count": int(c),
+        }
+        for t, v, c in zip(starts_s, result, counts)
+    ]
+    return {"bucket_seconds": width_out, "points": points}
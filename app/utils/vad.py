@@ -0,0 +1,131 @@
+"""
+Energy / zero-crossing voice activity detection for 16 kHz mono int16 PCM.
+
+`VadSegmenter` buffers arbitrarily sized PCM frames and turns them into utterance-sized
+segments: a segment closes after `silence_ms` of trailing silence, or at `max_segment_s`
+(cut at the quietest frame of the last second, so words are rarely split). Segments
+containing no speech are discarded, so silence never reaches MedASR.
+
+Per-frame features are computed for all buffered frames at once with NumPy:
+- energy: RMS in dBFS, compared against an adaptive noise floor
+- zero-crossing rate: lets quiet fricatives ("s", "f") count as speech
+"""
+from typing import List
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+class VadSegmenter:
+    def __init__(
+        self,
+        sample_rate: int = SAMPLE_RATE,
+        frame_ms: int = 30,
+        silence_ms: int = 600,
+        max_segment_s: float = 15.0,
+        min_speech_ms: int = 150,
+        padding_ms: int = 200,
+        min_energy_db: float = -50.0,
+        speech_margin_db: float = 10.0,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_len = sample_rate * frame_ms // 1000
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.max_frames = max(1, int(max_segment_s * 1000 / frame_ms))
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.padding_frames = padding_ms // frame_ms
+        self.search_frames = max(1, 1000 // frame_ms)
+        self.min_energy_db = min_energy_db
+        self.speech_margin_db = speech_margin_db
+
+        self.noise_db = min_energy_db
+        self._partial = b""          # Bytes not yet forming a whole frame
+        self._frames: List[np.ndarray] = []
+        self._energy: List[float] = []
+        self._speech: List[bool] = []
+        self._trailing_silence = 0
+        self._pre_roll: List[np.ndarray] = []
+
+    # ── Features ──
+
+    def _classify(self, frames: np.ndarray):
+        """frames: (n, frame_len) int16 -> (energy_db, is_speech) arrays."""
+        x = frames.astype(np.float32) / 32768.0
+        rms = np.sqrt(np.mean(x * x, axis=1))
+        energy_db = 20.0 * np.log10(np.maximum(rms, 1e-6))
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frames.shape[1]
+
+        threshold = max(self.min_energy_db, self.noise_db + self.speech_margin_db)
+        loud = energy_db > threshold
+        fricative = (energy_db > threshold - self.speech_margin_db / 2) & (zcr > 0.25) & (zcr < 0.6)
+        speech = loud | fricative
+
+        quiet = energy_db[~speech]
+        if quiet.size:
+            # Noise floor follows quiet frames quickly downwards and slowly upwards
+            level = float(np.percentile(quiet, 20))
+            rate = 0.5 if level < self.noise_db else min(1.0, 0.02 * quiet.size)
+            self.noise_db += rate * (level - self.noise_db)
+        return energy_db, speech
+
+    # ── Segmenting ──
+
+    def feed(self, pcm: bytes) -> List[bytes]:
+        """Add PCM bytes; returns the segments that completed."""
+        data = self._partial + pcm
+        usable = len(data) - len(data) % (self.frame_len * 2)
+        self._partial = data[usable:]
+        if not usable:
+            return []
+        frames = np.frombuffer(data[:usable], dtype="<i2").reshape(-1, self.frame_len)
+        energy_db, speech = self._classify(frames)
+
+        segments = []
+        for frame, e, is_speech in zip(frames, energy_db, speech):
+            if not self._frames and not is_speech:
+                # Outside an utterance: keep a short pre-roll so onsets are not clipped
+                self._pre_roll.append(frame)
+                if len(self._pre_roll) > self.padding_frames:
+                    self._pre_roll.pop(0)
+                continue
+            if not self._frames:
+                self._frames, self._energy, self._speech = list(self._pre_roll), [-120.0] * len(self._pre_roll), [False] * len(self._pre_roll)
+                self._pre_roll = []
+            self._frames.append(frame)
+            self._energy.append(float(e))
+            self._speech.append(bool(is_speech))
+            self._trailing_silence = 0 if is_speech else self._trailing_silence + 1
+
+            if self._trailing_silence >= self.silence_frames:
+                keep = len(self._frames) - self._trailing_silence + self.padding_frames
+                segments.extend(self._cut(keep))
+            elif len(self._frames) >= self.max_frames:
+                window = np.asarray(self._energy[-self.search_frames:])
+                cut = len(self._frames) - len(window) + int(np.argmin(window)) + 1
+                segments.extend(self._cut(cut))
+        return segments
+
+    def _cut(self, n: int) -> List[bytes]:
+        frames, speech = self._frames[:n], self._speech[:n]
+        self._frames, self._energy, self._speech = self._frames[n:], self._energy[n:], self._speech[n:]
+        if not any(self._speech):
+            # Remainder is silence: it becomes pre-roll for the next utterance
+            self._pre_roll = self._frames[-self.padding_frames:] if self.padding_frames else []
+            self._frames, self._energy, self._speech = [], [], []
+        self._trailing_silence = 0
+        for s in reversed(self._speech):
+            if s:
+                break
+            self._trailing_silence += 1
+        if sum(speech) < self.min_speech_frames:
+            return []
+        return [np.concatenate(frames).tobytes()]
+
+    def flush(self) -> List[bytes]:
+        """End of stream: return whatever speech is still buffered."""
+        segments = self._cut(len(self._frames)) if self._frames else []
+        self._partial = b""
+        self._pre_roll = []
+        return segments
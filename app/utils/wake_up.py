@@ -1,6 +1,6 @@
-import httpx
 import logging
 from app.core.config import settings
+from app.core.http import http_pool
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -13,9 +13,8 @@ async def wake_up_huggingface():
         return
         
     try:
-        async with httpx.AsyncClient() as client:
-            # Send a simple GET request to wake the space
-            await client.get(settings.HUGGINGFACE_SPACE, timeout=5.0)
-            logger.info("Sent wake-up ping to HuggingFace Space.")
+        # Send a simple GET request to wake the space
+        await http_pool.client.get(settings.HUGGINGFACE_SPACE, timeout=http_pool.timeout("wake"))
+        logger.info("Sent wake-up ping to HuggingFace Space.")
     except Exception as e:
         logger.warning(f"Failed to wake up HuggingFace Space: {e}")
@@ -0,0 +1,132 @@
+"""
+Latency and throughput of the agent endpoints.
+
+Sends requests with bounded concurrency to a running backend and reports, per scenario:
+throughput, p50/p99 total latency and p50/p99 time-to-first-token (first non-empty
+chunk of the streamed response).
+
+Scenarios:
+    deep-research   POST /agent/deep-research            (image + audio + PDF)
+    analyze         POST /agent/analyze                  (document Q&A)
+    summarize       POST /agent/summarize-medical-report (skin specialist → /agent/skin-india)
+
+Run against the fake Space to measure backend overhead without a GPU:
+    python -m benchmarks.fake_space --port 7861 --latency-ms 300 --token-rate 40 &
+    HUGGINGFACE_SPACE=http://127.0.0.1:7861 uvicorn app.main:app --port 8000 &
+    python -m benchmarks.agent_latency --base-url http://127.0.0.1:8000/api/v1 \\
+        --email admin@example.com --password adminpassword --space http://127.0.0.1:7861 \\
+        [--scenario all] [--requests 50] [--concurrency 8]
+
+Media URLs default to the fake Space's /media samples. deep-research and analyze also
+call Tavily/Groq/Gemini, so their numbers include those providers unless stubbed.
+Identical requests are served from the inference cache after the first one; start the
+API with INFERENCE_CACHE_MAX_MB=0 to measure the uncached path.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Optional
+
+import httpx
+
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def _scenarios(space: str) -> dict:
+    image, audio, pdf = f"{space}/media/image.png", f"{space}/media/audio.wav", f"{space}/media/report.pdf"
+    return {
+        "deep-research": ("/agent/deep-research", {
+            "image_url": image, "audio_url": audio, "pdf_url": pdf,
+            "vision_prompt": "Describe the key findings.",
+        }),
+        "analyze": ("/agent/analyze", {
+            "document_url": image, "question": "Summarize this document.",
+        }),
+        "summarize": ("/agent/summarize-medical-report", {
+            "image_url": image, "use_skin_specialist": True,
+        }),
+    }
+
+
+async def _login(client: httpx.AsyncClient, base_url: str, email: str, password: str) -> str:
+    resp = await client.post(f"{base_url}/auth/login/access-token", data={"username": email, "password": password})
+    resp.raise_for_status()
+    return resp.json()["access_token"]
+
+
+async def _one(client: httpx.AsyncClient, url: str, payload: dict, headers: dict) -> tuple[Optional[float], float, bool]:
+    """Returns (ttft_s, total_s, ok)."""
+    started = time.perf_counter()
+    ttft = None
+    try:
+        async with client.stream("POST", url, json=payload, headers=headers) as resp:
+            async for chunk in resp.aiter_bytes():
+                if chunk.strip() and ttft is None:
+                    ttft = time.perf_counter() - started
+            ok = resp.status_code < 400
+    except httpx.HTTPError:
+        ok = False
+    return ttft, time.perf_counter() - started, ok
+
+
+async def _run(name: str, url: str, payload: dict, headers: dict, requests: int, concurrency: int, timeout: float):
+    limiter = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        async def bounded():
+            async with limiter:
+                return await _one(client, url, payload, headers)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*[bounded() for _ in range(requests)])
+        elapsed = time.perf_counter() - started
+
+    ok = [r for r in results if r[2]]
+    totals = [r[1] * 1000 for r in ok]
+    ttfts = [r[0] * 1000 for r in ok if r[0] is not None]
+    print(f"{name:14s} n={requests} ok={len(ok)} conc={concurrency} elapsed={elapsed:.2f}s "
+          f"throughput={len(ok) / elapsed:.2f} req/s")
+    if totals:
+        print(f"{'':14s} total ms: p50={_pct(totals, 0.5):.1f} p99={_pct(totals, 0.99):.1f} mean={statistics.mean(totals):.1f}")
+    if ttfts:
+        print(f"{'':14s} ttft  ms: p50={_pct(ttfts, 0.5):.1f} p99={_pct(ttfts, 0.99):.1f}")
+
+
+async def main_async(args):
+    base_url = args.base_url.rstrip("/")
+    token = args.token
+    if not token:
+        async with httpx.AsyncClient(timeout=30) as client:
+            token = await _login(client, base_url, args.email, args.password)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    scenarios = _scenarios(args.space.rstrip("/"))
+    names = list(scenarios) if args.scenario == "all" else [args.scenario]
+    for name in names:
+        path, payload = scenarios[name]
+        if args.warmup:
+            await _run(f"{name} (warm)", f"{base_url}{path}", payload, headers, args.warmup, 1, args.timeout)
+        await _run(name, f"{base_url}{path}", payload, headers, args.requests, args.concurrency, args.timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000/api/v1")
+    parser.add_argument("--space", default="http://127.0.0.1:7861", help="Fake Space URL (serves the sample media)")
+    parser.add_argument("--token", default="", help="Bearer token (otherwise --email/--password login)")
+    parser.add_argument("--email", default="admin@example.com")
+    parser.add_argument("--password", default="adminpassword")
+    parser.add_argument("--scenario", choices=["all", "deep-research", "analyze", "summarize"], default="all")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=2, help="Sequential warm-up requests per scenario")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
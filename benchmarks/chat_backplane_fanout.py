@@ -0,0 +1,121 @@
+"""
+Fan-out latency of the chat backplane across worker processes.
+
+Starts N worker processes (default 4), each with its own ConnectionManager and fake sockets
+for the same set of users, then sends messages from the parent process and measures the
+time until every worker has delivered each message to its local sockets.
+
+Usage:
+    python -m benchmarks.chat_backplane_fanout --url redis://localhost:6379/0 [--workers 4] [--messages 2000]
+
+Latency uses time.monotonic_ns(), which is shared by all processes on one host.
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import statistics
+import time
+
+
+class _FakeSocket:
+    def __init__(self, results: "mp.Queue", worker: int):
+        self.results = results
+        self.worker = worker
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message: dict):
+        self.results.put((self.worker, message["seq"], time.monotonic_ns() - message["sent_ns"]))
+
+
+def _worker(url: str, worker: int, users: int, ready: "mp.Event", stop: "mp.Event", results: "mp.Queue"):
+    from app.api.chat import ConnectionManager
+    from app.core.backplane import create_backplane
+
+    async def main():
+        manager = ConnectionManager(backplane=create_backplane(url))
+        await manager.start()
+        for u in range(users):
+            await manager.connect(f"user-{u}", _FakeSocket(results, worker))
+        ready.set()
+        while not stop.is_set():
+            await asyncio.sleep(0.05)
+        await manager.stop()
+
+    asyncio.run(main())
+
+
+async def _publish(url: str, messages: int, users: int, rate: float):
+    from app.api.chat import ConnectionManager
+    from app.core.backplane import create_backplane
+
+    sender = ConnectionManager(backplane=create_backplane(url))
+    await sender.start()
+    interval = 1.0 / rate if rate else 0
+    for seq in range(messages):
+        await sender.send_personal_message(
+            {"seq": seq, "sent_ns": time.monotonic_ns(), "message": "x" * 64}, f"user-{seq % users}"
+        )
+        if interval:
+            await asyncio.sleep(interval)
+    await sender.stop()
+
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True, help="Backplane URL, e.g. redis://localhost:6379/0")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=1000.0, help="Messages per second (0 = unthrottled)")
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    stop = ctx.Event()
+    readies = [ctx.Event() for _ in range(args.workers)]
+    procs = [
+        ctx.Process(target=_worker, args=(args.url, w, args.users, readies[w], stop, results), daemon=True)
+        for w in range(args.workers)
+    ]
+    for p in procs:
+        p.start()
+    for r in readies:
+        if not r.wait(timeout=30):
+            raise SystemExit("Worker failed to start")
+
+    started = time.perf_counter()
+    asyncio.run(_publish(args.url, args.messages, args.users, args.rate))
+
+    expected = args.messages * args.workers
+    per_message = {}
+    latencies_ms = []
+    deadline = time.monotonic() + 30
+    while len(latencies_ms) < expected and time.monotonic() < deadline:
+        try:
+            worker, seq, latency_ns = results.get(timeout=1)
+        except Exception:
+            continue
+        latencies_ms.append(latency_ns / 1e6)
+        per_message[seq] = max(per_message.get(seq, 0.0), latency_ns / 1e6)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for p in procs:
+        p.join(timeout=5)
+
+    fanout = list(per_message.values())
+    print(f"workers={args.workers} messages={args.messages} deliveries={len(latencies_ms)}/{expected} elapsed={elapsed:.2f}s")
+    if latencies_ms:
+        print(f"per-delivery ms : p50={_pct(latencies_ms, 0.5):.3f} p99={_pct(latencies_ms, 0.99):.3f} max={max(latencies_ms):.3f}")
+        print(f"full fan-out ms : p50={_pct(fanout, 0.5):.3f} p99={_pct(fanout, 0.99):.3f} mean={statistics.mean(fanout):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Local stand-in for the HF Space, for benchmarking and failure testing without a GPU.
+
+Implements the endpoints the backend calls, with configurable behaviour:
+    POST /agent/vision, /agent/skin-india   streaming text/plain tokens
+    POST /agent/speech                      {"transcription": "..."}
+    POST /agent/siglip/text                 {"prediction": "...", "confidence": x, "scores": {...}}
+    POST /agent/siglip/embed                {"embeddings": [[...]]} for {"image_url"} or {"texts": [...]}
+    POST /agent/hear/embed                  {"embeddings": [[...]]}
+    GET  /                                  readiness (503 while "cold")
+    GET  /media/image.png, /media/audio.wav, /media/report.pdf   sample inputs
+
+Embeddings are deterministic per input (seeded by its SHA-256), so caches behave as
+they would against the real models.
+
+Usage:
+    python -m benchmarks.fake_space --port 7861 [--latency-ms 300] [--jitter-ms 100]
+        [--token-rate 40] [--tokens 120] [--failure-rate 0.05] [--cold-start-s 10]
+
+Point the backend at it with HUGGINGFACE_SPACE=http://127.0.0.1:7861.
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import random
+import struct
+import time
+import zlib
+
+import numpy as np
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+SIGLIP_DIM = 1152
+HEAR_DIM = 512
+
+_WORDS = (
+    "the patient presents with mild bilateral infiltrates no acute fracture is seen "
+    "lesion margins are irregular recommend follow up imaging and clinical correlation"
+).split()
+
+
+class _Config:
+    latency_ms = 300.0
+    jitter_ms = 100.0
+    token_rate = 40.0
+    tokens = 120
+    failure_rate = 0.0
+    cold_start_s = 0.0
+
+
+config = _Config()
+started_at = time.monotonic()
+app = FastAPI(title="Fake HF Space")
+
+
+def _vector(seed: bytes, dim: int) -> list:
+    rng = np.random.default_rng(int.from_bytes(hashlib.sha256(seed).digest()[:8], "little"))
+    v = rng.standard_normal(dim).astype(np.float32)
+    return (v / np.linalg.norm(v)).tolist()
+
+
+def _cold() -> bool:
+    return time.monotonic() - started_at < config.cold_start_s
+
+
+async def _gate():
+    """Cold start / failure injection / inference latency. Returns an error response or None."""
+    if _cold():
+        return Response("Space is starting", status_code=503)
+    if random.random() < config.failure_rate:
+        return Response("Injected failure", status_code=random.choice([500, 502, 504]))
+    delay = max(0.0, config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+    await asyncio.sleep(delay)
+    return None
+
+
+@app.get("/")
+async def readiness():
+    if _cold():
+        return Response("Space is starting", status_code=503)
+    return {"status": "ok"}
+
+
+async def _stream_tokens(prompt: str):
+    rng = random.Random(prompt)
+    interval = 1.0 / config.token_rate if config.token_rate else 0
+    for _ in range(config.tokens):
+        yield rng.choice(_WORDS) + " "
+        if interval:
+            await asyncio.sleep(interval)
+
+
+async def _vision(request: Request):
+    error = await _gate()
+    if error:
+        return error
+    body = await request.json()
+    return StreamingResponse(_stream_tokens(body.get("prompt", "") + body.get("image_url", "")), media_type="text/plain")
+
+
+app.post("/agent/vision")(_vision)
+app.post("/agent/skin-india")(_vision)
+
+
+@app.post("/agent/speech")
+async def speech(file: UploadFile = File(...)):
+    error = await _gate()
+    if error:
+        return error
+    data = await file.read()
+    rng = random.Random(hashlib.sha256(data).digest())
+    return {"transcription": " ".join(rng.choice(_WORDS) for _ in range(max(3, len(data) // 16000)))}
+
+
+@app.post("/agent/siglip/text")
+async def siglip_text(request: Request):
+    error = await _gate()
+    if error:
+        return error
+    body = await request.json()
+    candidates = body.get("candidates") or ["unknown"]
+    image = _vector(body.get("image_url", "").encode(), SIGLIP_DIM)
+    logits = np.array([np.dot(image, _vector(c.encode(), SIGLIP_DIM)) for c in candidates]) * 100
+    probs = np.exp(logits - logits.max())
+    probs /= probs.sum()
+    best = int(np.argmax(probs))
+    return {
+        "prediction": candidates[best],
+        "confidence": round(float(probs[best]), 4),
+        "scores": {c: round(float(p), 4) for c, p in zip(candidates, probs)},
+    }
+
+
+@app.post("/agent/siglip/embed")
+async def siglip_embed(request: Request):
+    error = await _gate()
+    if error:
+        return error
+    body = await request.json()
+    if body.get("texts"):
+        return {"embeddings": [_vector(t.encode(), SIGLIP_DIM) for t in body["texts"]]}
+    return {"embeddings": [_vector(body.get("image_url", "").encode(), SIGLIP_DIM)]}
+
+
+@app.post("/agent/hear/embed")
+async def hear_embed(file: UploadFile = File(...)):
+    error = await _gate()
+    if error:
+        return error
+    return {"embeddings": [_vector(await file.read(), HEAR_DIM)]}
+
+
+# ── Sample media ──
+
+def _sample_wav(seconds: float = 5.0, rate: int = 48000) -> bytes:
+    t = np.arange(int(seconds * rate)) / rate
+    tone = (0.3 * np.sin(2 * np.pi * 220 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))).astype("<f4")
+    body = np.repeat(tone[:, None], 2, axis=1).tobytes()  # Stereo float32, like a browser recorder
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + len(body), b"WAVE", b"fmt ", 16, 3, 2, rate, rate * 8, 8, 32,
+        b"data", len(body),
+    ) + body
+
+
+def _sample_png(size: int = 64) -> bytes:
+    """Grey gradient PNG."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(b"\x00" + bytes((x + y) * 2 % 256 for x in range(size)) for y in range(size))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _sample_pdf() -> bytes:
+    buf = io.BytesIO()
+    buf.write(b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+              b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+              b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 200 200]>>endobj\n"
+              b"trailer<</Root 1 0 R>>\n%%EOF\n")
+    return buf.getvalue()
+
+
+_MEDIA = {
+    "image.png": (_sample_png(), "image/png"),
+    "audio.wav": (_sample_wav(), "audio/wav"),
+    "report.pdf": (_sample_pdf(), "application/pdf"),
+}
+
+
+@app.get("/media/{name}")
+async def media(name: str):
+    if name not in _MEDIA:
+        return JSONResponse({"detail": "Not found"}, status_code=404)
+    data, media_type = _MEDIA[name]
+    return Response(data, media_type=media_type)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7861)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Mean inference latency")
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--token-rate", type=float, default=40.0, help="Streamed tokens per second (0 = no delay)")
+    parser.add_argument("--tokens", type=int, default=120, help="Tokens per streamed answer")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of calls answered with 5xx")
+    parser.add_argument("--cold-start-s", type=float, default=0.0, help="Answer 503 for this long after start")
+    args = parser.parse_args()
+
+    global started_at
+    started_at = time.monotonic()
+    for name in ("latency_ms", "jitter_ms", "token_rate", "tokens", "failure_rate", "cold_start_s"):
+        setattr(config, name, getattr(args, name))
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
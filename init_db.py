@@ -4,7 +4,8 @@ Recreates all tables with the latest schema
 """
 import asyncio
 from app.core.database import engine, Base
-from app.models import user, hospital, doctor, nurse, patient, medicine, lab_test, floor, availability, appointment, lab_report, appointment_chat, document, user_memory, appointment_vital
+from app.models import user, hospital, doctor, nurse, patient, medicine, lab_test, floor, availability, appointment, lab_report, appointment_chat, document, user_memory, appointment_vital, event, event_entry, event_stat, doctor_patient_chat, conversation
+from app.core.database import SessionLocal
 
 async def init_db():
     """Initialize database with all tables"""
@@ -39,6 +40,10 @@ async def init_db():
             except Exception:
                 pass
 
+            # Columns also upgraded at app startup (chat pair_key, event idempotency_key, ...)
+            from app.core.schema import upgrade_schema
+            for column in await upgrade_schema(conn):
+                print(f"Added column '{column}'.")
 
             # Check Patient table for new columns
             try:
@@ -58,6 +63,21 @@ async def init_db():
         except Exception as e:
             print(f"Schema update check completed with minor warnings: {e}")
 
+    # Data migration: legacy events.json_data blobs -> event_entries rows
+    from app.crud.event_entry import event_entry as crud_event_entry
+    async with SessionLocal() as db:
+        migrated = await crud_event_entry.migrate_legacy_json_data(db)
+        if migrated:
+            print(f"Migrated {migrated} event(s) from 'events.json_data' to 'event_entries'.")
+
+        from app.crud.event_stat import event_stat as crud_event_stat
+        if await crud_event_stat.ensure_built(db):
+            print("Built 'event_stats' dashboard aggregates.")
+
+        from app.crud.conversation import conversation as crud_conversation
+        if await crud_conversation.ensure_built(db):
+            print("Built 'conversations' chat summary.")
+
     print("✅ Database schema synchronized!")
     print("Note: Existing columns are not modified. If you changed a model, you may need a migration.")
     print("✅ Database initialized successfully!")